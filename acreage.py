@@ -0,0 +1,109 @@
+"""
+Vectorized acreage from field boundaries, used to validate stated acres.
+
+Every coordinate of every geometry is projected in one pyproj call to an
+equal-area CRS (CONUS Albers by default) and measured with shapely's
+array area, so thousands of boundaries are handled at once. validate_acres
+compares the computed acres with the acres properties of GeoJSON features
+(m_area_ac/bmp_ac for PLET), flags features outside a relative tolerance
+and can overwrite them with the computed value.
+
+Point features (such as the water inputs) have no area and are reported
+as unverifiable.
+"""
+import json
+import numpy as np
+import shapely
+from pyproj import Transformer
+
+ACRES_PER_SQUARE_METER = 1 / 4046.8564224
+EQUAL_AREA_CRS = "EPSG:5070"  # NAD83 / Conus Albers
+DEFAULT_TOLERANCE = 0.05
+
+_transformers = {}
+
+
+def _transformer(source_crs, target_crs):
+    key = (source_crs, target_crs)
+    if key not in _transformers:
+        _transformers[key] = Transformer.from_crs(source_crs, target_crs, always_xy=True)
+    return _transformers[key]
+
+
+def to_shapes(geometries):
+    """Shapely array from GeoJSON dicts or shapely geometries (None stays None)."""
+    geometries = list(geometries)
+    if all(g is None or isinstance(g, shapely.Geometry) for g in geometries):
+        return np.array(geometries, dtype=object)
+    return shapely.from_geojson([json.dumps(g) if g else None for g in geometries])
+
+
+def equal_area_acres(geometries, source_crs="EPSG:4326", equal_area_crs=EQUAL_AREA_CRS):
+    """
+    Acres of each geometry, projecting all coordinates in a single call.
+
+    Missing geometries are NaN; points and lines are 0.
+    """
+    shapes = to_shapes(geometries)
+    transformer = _transformer(source_crs, equal_area_crs)
+    projected = shapely.transform(shapes, lambda xy: np.column_stack(transformer.transform(xy[:, 0], xy[:, 1])))
+    acres = shapely.area(projected) * ACRES_PER_SQUARE_METER
+    return np.where(shapely.is_missing(shapes), np.nan, acres)
+
+
+def validate_acres(features, acres_keys=("m_area_ac", "bmp_ac"), tolerance=DEFAULT_TOLERANCE, fix=False,
+                   equal_area_crs=EQUAL_AREA_CRS):
+    """
+    Compare stated acres properties with the acres of each feature's geometry.
+
+    Args:
+        features (list): GeoJSON features in lon/lat
+        acres_keys (tuple): Properties holding stated acres
+        tolerance (float): Relative difference that is flagged
+        fix (bool): Replace flagged (or missing) acres with the computed value
+
+    Returns:
+        tuple: (features, report) where report has one dict per feature with
+        computed_acres, per-key stated values and drift, and a status of
+        ok, flagged, fixed or unverifiable. Inputs are not modified.
+    """
+    computed = equal_area_acres([feature.get("geometry") for feature in features], equal_area_crs=equal_area_crs)
+    stated = {
+        key: np.array([(feature.get("properties") or {}).get(key) for feature in features], dtype=float)
+        for key in acres_keys
+    }
+
+    report = [{"index": i, "computed_acres": round(float(acres), 2) if acres > 0 else None}
+              for i, acres in enumerate(computed)]
+    flagged = np.zeros(len(features), dtype=bool)
+    for key, values in stated.items():
+        with np.errstate(divide="ignore", invalid="ignore"):
+            drift = (values - computed) / computed
+        off = (computed > 0) & ~(np.abs(drift) <= tolerance)  # NaN stated acres count as off
+        flagged |= off
+        for i in np.flatnonzero(computed > 0):
+            report[i][key] = None if np.isnan(values[i]) else float(values[i])
+            report[i][f"{key}_drift"] = None if np.isnan(drift[i]) else round(float(drift[i]), 4)
+
+    output = list(features)
+    for i, entry in enumerate(report):
+        if not computed[i] > 0:
+            entry["status"] = "unverifiable"
+        elif not flagged[i]:
+            entry["status"] = "ok"
+        elif fix:
+            properties = dict(features[i].get("properties") or {})
+            properties.update({key: entry["computed_acres"] for key in acres_keys})
+            output[i] = {**features[i], "properties": properties}
+            entry["status"] = "fixed"
+        else:
+            entry["status"] = "flagged"
+    return output, report
+
+
+def summarize_validation(report):
+    """Count validation report entries by status, e.g. {'ok': 950, 'flagged': 12}."""
+    counts = {}
+    for entry in report:
+        counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+    return counts
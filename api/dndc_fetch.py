@@ -1,20 +1,313 @@
 import requests
 import json
-import csv
-import statistics
+import pandas as pd
+import numpy as np
+import argparse
+import os
+import sys
+import gzip
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urljoin
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-API_KEY = "Apikey"
-URL = "https://api.regrow.ag/dndc-scenarios-service/v0/api/projects"
+API_KEY = os.environ.get("REGROW_API_KEY", "Apikey")
+BASE_URL = "https://api.regrow.ag/dndc-scenarios-service/v0/api/"
 
-headers = {
-    "x-apikey": API_KEY,
-    "Content-Type": "application/json"
+# Output endpoints pulled for every project by default
+DEFAULT_ENDPOINTS = ["project_level_scope_1"]
+
+
+class RegrowDNDCClient:
+    """
+    Client for the Regrow DNDC scenarios service.
+
+    A single keep-alive session is shared by all worker threads; its
+    connection pool is sized to the worker count, and retries with
+    exponential backoff cover rate limiting and transient 5XX responses.
+    """
+
+    def __init__(self, api_key=API_KEY, base_url=BASE_URL, max_workers=8, retries=5, backoff_factor=1.0, timeout=120):
+        self.base_url = base_url
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({
+            "x-apikey": api_key,
+            "Content-Type": "application/json"
+        })
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET"],
+            respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, path, params=None):
+        """GET a path relative to the service root and return the decoded JSON."""
+        response = self.session.get(urljoin(self.base_url, path), params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def paginate(self, path, key, params=None):
+        """
+        Yield items under `key` across every page of a list endpoint.
+
+        Follows a `next` link when the service returns one and otherwise
+        stops after the first page.
+        """
+        url = urljoin(self.base_url, path)
+        while url:
+            response = self.session.get(url, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+            yield from data.get(key, [])
+            next_url = data.get("next")
+            url = urljoin(url, next_url) if next_url else None
+            params = None  # the next link already carries the query string
+
+    def list_projects(self):
+        """Return every project visible to the API key."""
+        return list(self.paginate("projects", "projects"))
+
+    def fetch_conditional(self, project_name, endpoint, etag=None, last_modified=None):
+        """
+        Fetch one output endpoint, sending If-None-Match/If-Modified-Since.
+
+        Returns (data, response_headers); data is None when the server answers
+        304 Not Modified.
+        """
+        conditional_headers = {}
+        if etag:
+            conditional_headers["If-None-Match"] = etag
+        if last_modified:
+            conditional_headers["If-Modified-Since"] = last_modified
+        response = self.session.get(urljoin(self.base_url, endpoint), params={"project_name": project_name},
+                                    headers=conditional_headers, timeout=self.timeout)
+        if response.status_code == 304:
+            return None, response.headers
+        response.raise_for_status()
+        return response.json(), response.headers
+
+
+class RegrowMirror:
+    """
+    Local mirror of Regrow project outputs.
+
+    Each (project, endpoint) response is stored as compact gzipped JSON next
+    to a small metadata file holding the project's created_at/is_finalized
+    and the response's ETag/Last-Modified. Finalized projects whose
+    created_at has not changed are skipped without a request; everything
+    else is re-fetched conditionally, so unchanged outputs cost one 304.
+    """
+
+    def __init__(self, client, mirror_dir="regrow_mirror"):
+        self.client = client
+        self.mirror_dir = mirror_dir
+
+    def _paths(self, project_name, endpoint):
+        project_dir = os.path.join(self.mirror_dir, project_name)
+        return (os.path.join(project_dir, f"{endpoint}.json.gz"),
+                os.path.join(project_dir, f"{endpoint}.meta.json"))
+
+    def read_meta(self, project_name, endpoint):
+        """Return the stored metadata for a mirrored output, or None."""
+        _, meta_path = self._paths(project_name, endpoint)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, 'r') as f:
+            return json.load(f)
+
+    def read(self, project_name, endpoint):
+        """Load a mirrored output, or None if it has not been pulled."""
+        data_path, _ = self._paths(project_name, endpoint)
+        if not os.path.exists(data_path):
+            return None
+        with gzip.open(data_path, 'rt') as f:
+            return json.load(f)
+
+    def write(self, project_name, endpoint, data, meta):
+        """Store an output and its metadata, replacing any previous copy."""
+        data_path, meta_path = self._paths(project_name, endpoint)
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+        with gzip.open(data_path + ".tmp", 'wt') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(data_path + ".tmp", data_path)
+        with open(meta_path, 'w') as f:
+            json.dump(meta, f)
+
+    def is_current(self, project, endpoint):
+        """True when a finalized project's output is already mirrored and unchanged."""
+        meta = self.read_meta(project['project_name'], endpoint)
+        return bool(
+            meta
+            and meta.get('is_finalized')
+            and project.get('is_finalized')
+            and meta.get('created_at') == project.get('created_at')
+        )
+
+    def sync_one(self, project, endpoint):
+        """Refresh one output; returns 'skipped', 'not_modified' or 'updated'."""
+        project_name = project['project_name']
+        if self.is_current(project, endpoint):
+            return 'skipped'
+
+        meta = self.read_meta(project_name, endpoint) or {}
+        data, response_headers = self.client.fetch_conditional(
+            project_name, endpoint, meta.get('etag'), meta.get('last_modified'))
+        meta.update({
+            'project_name': project_name,
+            'endpoint': endpoint,
+            'created_at': project.get('created_at'),
+            'is_finalized': project.get('is_finalized'),
+            'checked_at': datetime.now(timezone.utc).isoformat()
+        })
+        if data is None:
+            _, meta_path = self._paths(project_name, endpoint)
+            with open(meta_path, 'w') as f:
+                json.dump(meta, f)
+            return 'not_modified'
+
+        meta.update({
+            'etag': response_headers.get('ETag'),
+            'last_modified': response_headers.get('Last-Modified'),
+            'fetched_at': meta['checked_at']
+        })
+        self.write(project_name, endpoint, data, meta)
+        return 'updated'
+
+    def sync(self, projects, endpoints=DEFAULT_ENDPOINTS):
+        """
+        Refresh every (project, endpoint) pair concurrently.
+
+        Yields (project_name, endpoint, status, error) as each pair completes.
+        """
+        with ThreadPoolExecutor(max_workers=self.client.max_workers) as executor:
+            futures = {
+                executor.submit(self.sync_one, project, endpoint): (project['project_name'], endpoint)
+                for project in projects
+                for endpoint in endpoints
+            }
+            for future in as_completed(futures):
+                project_name, endpoint = futures[future]
+                try:
+                    yield project_name, endpoint, future.result(), None
+                except Exception as e:
+                    yield project_name, endpoint, 'error', e
+
+
+# Normalized field_level paths and the flat column each one is stored in
+FIELD_LEVEL_COLUMNS = {
+    'field_name': 'field_name',
+    'reporting_information.start_date': 'start_date',
+    'reporting_information.end_date': 'end_date',
+    'reporting_information.acres': 'acres',
+    'outcomes.reversible_outcomes.dsoc.baseline': 'dsoc_baseline',
+    'outcomes.reversible_outcomes.dsoc.practice_change': 'dsoc_practice',
+    'outcomes.non_reversible_outcomes.direct_n2o.baseline': 'direct_n2o_baseline',
+    'outcomes.non_reversible_outcomes.direct_n2o.practice_change': 'direct_n2o_practice',
+    'outcomes.non_reversible_outcomes.direct_n2o.preliminary_credit': 'direct_n2o_delta',
+    'outcomes.non_reversible_outcomes.indirect_n2o.baseline': 'indirect_n2o_baseline',
+    'outcomes.non_reversible_outcomes.indirect_n2o.practice_change': 'indirect_n2o_practice',
+    'outcomes.non_reversible_outcomes.indirect_n2o.credit': 'indirect_n2o_delta'
 }
 
-response = requests.get(URL, headers=headers)
+# Flat CSV/Parquet column order
+FIELD_COLUMNS = [
+    'field_id', 'field_name', 'start_date', 'end_date', 'acres',
+    'dsoc_baseline', 'dsoc_practice', 'dsoc_delta',
+    'direct_n2o_baseline', 'direct_n2o_practice', 'direct_n2o_delta',
+    'indirect_n2o_baseline', 'indirect_n2o_practice', 'indirect_n2o_delta'
+]
 
-if response.status_code == 200:
-    projects = response.json().get("projects", [])
+OUTLIER_METRICS = ['dsoc_delta', 'direct_n2o_delta', 'indirect_n2o_delta']
+
+
+def flatten_field_level(field_level):
+    """Normalize a `field_level` mapping into a typed DataFrame with FIELD_COLUMNS."""
+    df = pd.json_normalize(list(field_level.values()))
+    df = df.reindex(columns=list(FIELD_LEVEL_COLUMNS)).rename(columns=FIELD_LEVEL_COLUMNS)
+    df.insert(0, 'field_id', list(field_level.keys()))
+
+    df['field_id'] = df['field_id'].astype('string')
+    df['field_name'] = df['field_name'].astype('string')
+    for col in ['start_date', 'end_date']:
+        df[col] = pd.to_datetime(df[col], errors='coerce')
+    numeric_cols = [col for col in FIELD_COLUMNS if col not in ('field_id', 'field_name', 'start_date', 'end_date', 'dsoc_delta')]
+    df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors='coerce').astype('float64')
+
+    # dsoc_delta is dsoc_practice - dsoc_baseline; NaN when either side is missing
+    df['dsoc_delta'] = df['dsoc_practice'] - df['dsoc_baseline']
+    return df[FIELD_COLUMNS]
+
+
+def add_outlier_flags(df, metrics=OUTLIER_METRICS, z_threshold=2.0, iqr_factor=1.5):
+    """
+    Add z-score and IQR outlier columns for each metric.
+
+    `{metric}_zscore` uses the sample standard deviation; `{metric}_z_outlier`
+    flags |z| > z_threshold and `{metric}_iqr_outlier` flags values outside
+    [Q1 - iqr_factor*IQR, Q3 + iqr_factor*IQR]. Missing values are never flagged.
+    """
+    for metric in metrics:
+        values = df[metric]
+        std = values.std()
+        df[f'{metric}_zscore'] = (values - values.mean()) / std if std else np.nan
+        df[f'{metric}_z_outlier'] = df[f'{metric}_zscore'].abs() > z_threshold
+        q1, q3 = values.quantile([0.25, 0.75])
+        iqr = q3 - q1
+        df[f'{metric}_iqr_outlier'] = (values < q1 - iqr_factor * iqr) | (values > q3 + iqr_factor * iqr)
+    return df
+
+
+def summarize_field_level(data, project_name, endpoint, output_dir="."):
+    """Flatten field-level outcomes to CSV/Parquet, print recalculated totals and flag outliers."""
+    df = add_outlier_flags(flatten_field_level(data.get('field_level', {})))
+
+    output_base = os.path.join(output_dir, f"{project_name}_{endpoint}_fields")
+    df.to_csv(f"{output_base}.csv", index=False)
+    print(f"✅ Field-level data saved to: {output_base}.csv")
+    try:
+        df.to_parquet(f"{output_base}.parquet", index=False)
+        print(f"✅ Field-level data saved to: {output_base}.parquet")
+    except ImportError as e:
+        print(f"Skipping Parquet output ({e})")
+
+    # --- RECALCULATE TOTALS AS REQUESTED ---
+    # non-reversible outcomes = sum of all fields dsoc_delta
+    # reversible outcomes = sum of all fields direct_n2o_delta + indirect_n2o_delta
+    total_non_reversible = df['dsoc_delta'].sum()
+    total_reversible = df['direct_n2o_delta'].sum() + df['indirect_n2o_delta'].sum()
+    total_impacts = total_non_reversible + total_reversible
+
+    print("\nProject Name:", project_name)
+    print("Total Non-Reversible Outcomes (sum dsoc_delta):", total_non_reversible)
+    print("Total Reversible Outcomes (sum direct_n2o_delta + indirect_n2o_delta):", total_reversible)
+    print("Total Impacts:", total_impacts)
+
+    # --- OUTLIER DETECTION ---
+    for metric in OUTLIER_METRICS:
+        count = df[metric].notna().sum()
+        if count < 2:
+            print(f"Not enough data for outlier detection for {metric}.")
+            continue
+        outliers = df.loc[df[f'{metric}_z_outlier'], 'field_name'].tolist()
+        iqr_count = df[f'{metric}_iqr_outlier'].sum()
+        print(f"Outliers for {metric} (>|2 std dev| from mean): {outliers}")
+        print(f"Number of fields: {count}")
+        print(f"Number of fields with outliers: {len(outliers)}")
+        print(f"Percentage of fields with outliers: {len(outliers) / count * 100:.2f}%")
+        print(f"Number of fields outside 1.5 IQR: {iqr_count}\n")
+    return df
+
+
+def print_projects(projects):
+    """Print the project listing."""
     for project in projects:
         print(f"Project Name: {project.get('project_name')}")
         print(f"Created At: {project.get('created_at')}")
@@ -22,127 +315,65 @@ if response.status_code == 200:
         print(f"Is Finalized: {project.get('is_finalized')}")
         print(f"Results Available: {project.get('results_available')}")
         print("-" * 40)
-else:
-    print(f"Failed to fetch projects. Status code: {response.status_code}")
-    print(response.text)
-
-# Try different output endpoints for the TNC Minnesota project
-project_name = "TNC_Minnesota-2024-Batch-1-Final-3"
-
-print(f"\nTrying different output endpoints for: {project_name}")
-print("=" * 60)
-
-endpoints = ["project_level_scope_1"]
-
-for endpoint in endpoints:
-    URL = f"https://api.regrow.ag/dndc-scenarios-service/v0/api/{endpoint}"
-    params = {"project_name": project_name}
-    print(f"\nTrying endpoint: {endpoint}")
-    response = requests.get(URL, headers=headers, params=params)
-    if response.status_code == 200:
-        data = response.json()
-        print(f"✅ SUCCESS! Status code: {response.status_code}")
-        # Save data to JSON file
-        filename = f"{project_name}_{endpoint}.json"
-        with open(filename, 'w') as f:
-            json.dump(data, f, indent=2)
-        print(f"✅ Data saved to: {filename}")
-        print(f"Response keys: {list(data.keys()) if isinstance(data, dict) else 'Not a dict'}")
-
-        # --- FLATTEN FIELD-LEVEL DATA TO CSV ---
-        field_level = data.get('field_level', {})
-        csv_rows = []
-        dsoc_deltas = []
-        direct_n2o_deltas = []
-        indirect_n2o_deltas = []
-        dsoc_fields = []
-        direct_n2o_fields = []
-        indirect_n2o_fields = []
-        for field_id, field_data in field_level.items():
-            row = {}
-            row['field_name'] = field_data.get('field_name')
-            ri = field_data.get('reporting_information', {})
-            row['start_date'] = ri.get('start_date')
-            row['end_date'] = ri.get('end_date')
-            row['acres'] = ri.get('acres')
-            outcomes = field_data.get('outcomes', {})
-            # Reversible outcomes
-            rev = outcomes.get('reversible_outcomes', {})
-            dsoc = rev.get('dsoc', {})
-            row['dsoc_baseline'] = dsoc.get('baseline')
-            row['dsoc_practice'] = dsoc.get('practice_change')
-            # Calculate dsoc_delta as dsoc_practice - dsoc_baseline
-            dsoc_baseline = dsoc.get('baseline')
-            dsoc_practice = dsoc.get('practice_change')
-            row['dsoc_delta'] = dsoc_practice - dsoc_baseline if dsoc_baseline is not None and dsoc_practice is not None else None
-            # Non-reversible outcomes
-            nonrev = outcomes.get('non_reversible_outcomes', {})
-            direct_n2o = nonrev.get('direct_n2o', {})
-            row['direct_n2o_baseline'] = direct_n2o.get('baseline')
-            row['direct_n2o_practice'] = direct_n2o.get('practice_change')
-            row['direct_n2o_delta'] = direct_n2o.get('preliminary_credit')
-            # Indirect n2o
-            indirect_n2o = nonrev.get('indirect_n2o', {})
-            row['indirect_n2o_baseline'] = indirect_n2o.get('baseline')
-            row['indirect_n2o_practice'] = indirect_n2o.get('practice_change')
-            row['indirect_n2o_delta'] = indirect_n2o.get('credit')
-            csv_rows.append(row)
-            # Collect for stats
-            if row['dsoc_delta'] is not None:
-                dsoc_deltas.append(row['dsoc_delta'])
-                dsoc_fields.append((row['field_name'], row['dsoc_delta']))
-            if row['direct_n2o_delta'] is not None:
-                direct_n2o_deltas.append(row['direct_n2o_delta'])
-                direct_n2o_fields.append((row['field_name'], row['direct_n2o_delta']))
-            if row['indirect_n2o_delta'] is not None:
-                indirect_n2o_deltas.append(row['indirect_n2o_delta'])
-                indirect_n2o_fields.append((row['field_name'], row['indirect_n2o_delta']))
-        csv_filename = f"{project_name}_{endpoint}_fields.csv"
-        fieldnames = [
-            'field_name', 'start_date', 'end_date', 'acres',
-            'dsoc_baseline', 'dsoc_practice', 'dsoc_delta',
-            'direct_n2o_baseline', 'direct_n2o_practice', 'direct_n2o_delta',
-            'indirect_n2o_baseline', 'indirect_n2o_practice', 'indirect_n2o_delta'
-        ]
-        with open(csv_filename, 'w', newline='') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            for row in csv_rows:
-                writer.writerow(row)
-        print(f"✅ Field-level data saved to: {csv_filename}")
-
-        # --- RECALCULATE TOTALS AS REQUESTED ---
-        # non-reversible outcomes = sum of all fields dsoc_delta
-        # reversible outcomes = sum of all fields direct_n2o_delta + indirect_n2o_delta
-        total_non_reversible = sum(dsoc_deltas)
-        total_reversible = sum(direct_n2o_deltas) + sum(indirect_n2o_deltas)
-        total_impacts = total_non_reversible + total_reversible
-
-        print("\nProject Name:", project_name)
-        print("Total Non-Reversible Outcomes (sum dsoc_delta):", total_non_reversible)
-        print("Total Reversible Outcomes (sum direct_n2o_delta + indirect_n2o_delta):", total_reversible)
-        print("Total Impacts:", total_impacts)
-
-        # --- OUTLIER DETECTION ---
-        def find_outliers(values, fields, label):
-            if len(values) < 2:
-                print(f"Not enough data for outlier detection for {label}.")
-                return []
-            mean = statistics.mean(values)
-            stdev = statistics.stdev(values)
-            outliers = [fname for fname, val in fields if abs(val - mean) > 2 * stdev]
-            print(f"Outliers for {label} (>|2 std dev| from mean): {outliers}")
-            print(f"Number of fields: {len(values)}")
-            print(f"Number of fields with outliers: {len(outliers)}")
-            percent = (len(outliers) / len(values)) * 100 if values else 0
-            print(f"Percentage of fields with outliers: {percent:.2f}%\n")
-            return outliers
-
-        find_outliers(dsoc_deltas, dsoc_fields, 'dsoc_delta')
-        find_outliers(direct_n2o_deltas, direct_n2o_fields, 'direct_n2o_delta')
-        find_outliers(indirect_n2o_deltas, indirect_n2o_fields, 'indirect_n2o_delta')
-
-        break
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mirror Regrow DNDC outputs for finalized projects in parallel")
+    parser.add_argument("--projects", nargs="+",
+                        help="Project names to pull (default: every finalized project with results available)")
+    parser.add_argument("--endpoints", nargs="+", default=DEFAULT_ENDPOINTS,
+                        help="Output endpoints to fetch for each project")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent requests")
+    parser.add_argument("--mirror-dir", default="regrow_mirror", help="Local mirror of compressed outputs")
+    parser.add_argument("--output-dir", default=".", help="Directory for field-level CSV outputs")
+    parser.add_argument("--summarize-all", action="store_true",
+                        help="Summarize every mirrored output, not just the ones updated by this run")
+    parser.add_argument("--list", action="store_true", help="Only list projects and exit")
+    args = parser.parse_args()
+
+    client = RegrowDNDCClient(max_workers=args.workers)
+    projects = client.list_projects()
+
+    if args.list:
+        print_projects(projects)
+        return
+
+    missing = []
+    if args.projects:
+        listed = {project.get('project_name') for project in projects}
+        missing = [name for name in args.projects if name not in listed]
+        for name in missing:
+            print(f"❌ Project not found: {name}")
+        projects = [project for project in projects if project.get('project_name') in args.projects]
     else:
-        print(f"❌ Failed. Status code: {response.status_code}")
-        print(f"Error: {response.text}")
+        projects = [
+            project for project in projects
+            if project.get('is_finalized') and project.get('results_available')
+        ]
+    print(f"Syncing {len(args.endpoints)} endpoint(s) for {len(projects)} project(s) with {args.workers} workers")
+    print("=" * 60)
+
+    mirror = RegrowMirror(client, args.mirror_dir)
+    os.makedirs(args.output_dir, exist_ok=True)
+    counts = {'updated': 0, 'not_modified': 0, 'skipped': 0, 'error': 0}
+    for project_name, endpoint, status, error in mirror.sync(projects, args.endpoints):
+        counts[status] += 1
+        if error is not None:
+            print(f"❌ Failed {project_name} / {endpoint}: {error}")
+            continue
+        if status == 'updated':
+            print(f"✅ Mirrored {project_name} / {endpoint}")
+        if status == 'updated' or args.summarize_all:
+            data = mirror.read(project_name, endpoint)
+            if isinstance(data, dict) and 'field_level' in data:
+                summarize_field_level(data, project_name, endpoint, args.output_dir)
+
+    print(f"Updated: {counts['updated']}, Not modified: {counts['not_modified']}, "
+          f"Skipped (finalized): {counts['skipped']}, Failed: {counts['error']}")
+    if missing:
+        print(f"Not found: {', '.join(missing)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,13 @@
 import mrvApi as mrv
 import requests
 import json
-import pandas as pd
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 import time
 import os
 import sys
+import argparse
+import csv
 from contextlib import contextmanager
 
 # Configure API connection
@@ -39,6 +40,16 @@ ANALYSIS_YEARS = list(range(2020, 2025))  # 2020 to 2024
 # Global variable for log file
 log_file = None
 
+# Cached season/event snapshots used for incremental runs
+CACHE_DIR = "gmi_analysis_results/cache"
+
+# Maximum number of IDs per `_in` filter
+QUERY_BATCH_SIZE = 200
+
+# Rows buffered per Parquet row group, and Excel's per-sheet row limit
+EXPORT_BATCH_SIZE = 10000
+EXCEL_MAX_ROWS = 1048576
+
 # Add this at the top of the file after the imports
 TILLAGE_TYPE_MAP = {
     1: "Chisel",
@@ -135,88 +146,6 @@ def log_progress(message: str, indent: int = 0):
         log_file.write(formatted_message + '\n')
         log_file.flush()  # Ensure immediate writing to file
 
-def get_season_id(field_id: str, year: int) -> Optional[str]:
-    """Get season ID for a field and year."""
-    query = """
-    query MyQuery($fieldId: uuid!, $year: smallint!) {
-      farmSeason(where: {fieldId: {_eq: $fieldId}, year: {_eq: $year}}) {
-        id
-      }
-    }
-    """
-    
-    variables = {
-        "fieldId": field_id,
-        "year": year
-    }
-
-    try:
-        response = requests.post(url, json={'query': query, 'variables': variables}, headers=headers)
-        response.raise_for_status()
-        
-        response_data = response.json()
-        if response_data['data']['farmSeason']:
-            return response_data['data']['farmSeason'][0]['id']
-        return None
-    except Exception as e:
-        log_progress(f"Error getting season ID for field {field_id}, year {year}: {str(e)}")
-        return None
-
-def get_field_events(season_id: str) -> List[Dict[str, Any]]:
-    """Get all events for a season including cover crops, tillage, fertilizer, and pesticide data."""
-    query = """
-    query GetFieldEvents($seasonId: uuid!) {
-      farmEventData(where: {seasonId: {_eq: $seasonId}}) {
-        id
-        eventId
-        doneAt
-        coverCropSeedingRate
-        coverCropTerminationTypeId
-        isCoverCropSeededAerially
-        tillageDepth
-        tillageDataId
-        fertilizerDataId
-        pesticideCount
-        many_event_data_has_many_tillage_types {
-          tillageTypeId
-        }
-        fertilizer_datum {
-          applicationMethodId
-          fertilizerId
-          fertilizerCategoryId
-          rate
-          injectionDepth
-        }
-      }
-    }
-    """
-    
-    variables = {
-        "seasonId": season_id
-    }
-
-    try:
-        response = requests.post(url, json={'query': query, 'variables': variables}, headers=headers)
-        response.raise_for_status()
-        
-        response_data = response.json()
-        
-        if 'errors' in response_data:
-            log_progress(f"GraphQL errors: {response_data['errors']}")
-            return []
-            
-        if 'data' in response_data and 'farmEventData' in response_data['data']:
-            events = response_data['data']['farmEventData']
-            log_progress(f"Retrieved {len(events)} events for season {season_id}")
-            return events
-        else:
-            log_progress(f"Unexpected response structure: {response_data}")
-            return []
-            
-    except Exception as e:
-        log_progress(f"Error getting field events: {str(e)}")
-        return []
-
 def get_project_details(project_id: str) -> Dict[str, Any]:
     """Get detailed project information including fields and farmers."""
     query = """
@@ -283,7 +212,153 @@ def get_producer_fields(producer_id: str, year: int) -> List[Dict[str, Any]]:
     log_progress(f"Found {len(fields)} fields")
     return fields
 
-def analyze_project_data(project_id: str) -> Dict[str, Any]:
+def load_snapshot(project_name: str) -> Dict[str, Any]:
+    """Load the cached season/event snapshot for a project, or an empty one."""
+    snapshot_path = os.path.join(CACHE_DIR, f"{project_name}.json")
+    if os.path.exists(snapshot_path):
+        try:
+            with open(snapshot_path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            log_progress(f"Error loading snapshot {snapshot_path}, starting fresh: {str(e)}")
+    return {'high_water_mark': None, 'seasons': {}, 'events': {}}
+
+def save_snapshot(project_name: str, snapshot: Dict[str, Any]) -> None:
+    """Write the season/event snapshot for a project atomically."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    snapshot_path = os.path.join(CACHE_DIR, f"{project_name}.json")
+    tmp_path = snapshot_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_path, snapshot_path)
+    log_progress(f"Saved snapshot: {snapshot_path}")
+
+def run_query(query: str, variables: Dict[str, Any]) -> Dict[str, Any]:
+    """Run a GraphQL query and return its data block, raising on GraphQL errors."""
+    response = requests.post(url, json={'query': query, 'variables': variables}, headers=headers)
+    response.raise_for_status()
+    response_data = response.json()
+    if 'errors' in response_data:
+        raise ValueError(f"GraphQL errors: {response_data['errors']}")
+    return response_data['data']
+
+def get_seasons_since(field_ids: List[str], since: Optional[str]) -> List[Dict[str, Any]]:
+    """Get seasons in ANALYSIS_YEARS for the given fields, modified after `since` if set."""
+    query = """
+    query UpdatedSeasons($where: farmSeason_bool_exp!) {
+      farmSeason(where: $where) {
+        id
+        fieldId
+        year
+        updatedAt
+      }
+    }
+    """
+
+    seasons = []
+    for i in range(0, len(field_ids), QUERY_BATCH_SIZE):
+        where = {
+            'fieldId': {'_in': field_ids[i:i + QUERY_BATCH_SIZE]},
+            'year': {'_in': ANALYSIS_YEARS}
+        }
+        if since:
+            where['updatedAt'] = {'_gt': since}
+        seasons.extend(run_query(query, {'where': where})['farmSeason'])
+    return seasons
+
+def get_events_since(season_ids: List[str], since: Optional[str]) -> List[Dict[str, Any]]:
+    """Get events for the given seasons, modified after `since` if set."""
+    query = """
+    query UpdatedFieldEvents($where: farmEventData_bool_exp!) {
+      farmEventData(where: $where) {
+        id
+        seasonId
+        updatedAt
+        eventId
+        doneAt
+        coverCropSeedingRate
+        coverCropTerminationTypeId
+        isCoverCropSeededAerially
+        tillageDepth
+        tillageDataId
+        fertilizerDataId
+        pesticideCount
+        many_event_data_has_many_tillage_types {
+          tillageTypeId
+        }
+        fertilizer_datum {
+          applicationMethodId
+          fertilizerId
+          fertilizerCategoryId
+          rate
+          injectionDepth
+        }
+      }
+    }
+    """
+
+    events = []
+    for i in range(0, len(season_ids), QUERY_BATCH_SIZE):
+        where = {'seasonId': {'_in': season_ids[i:i + QUERY_BATCH_SIZE]}}
+        if since:
+            where['updatedAt'] = {'_gt': since}
+        events.extend(run_query(query, {'where': where})['farmEventData'])
+    return events
+
+def refresh_snapshot(snapshot: Dict[str, Any], field_ids: List[str]) -> Dict[str, Any]:
+    """
+    Merge seasons and events modified since the snapshot's high-water mark.
+
+    Fields not yet in the snapshot are pulled in full; known fields only pull
+    rows whose updatedAt is past the high-water mark. Deleted events are not
+    detected by a delta pull, so run with --full-refresh periodically.
+    """
+    since = snapshot.get('high_water_mark')
+    seasons = snapshot.setdefault('seasons', {})
+    events_by_season = snapshot.setdefault('events', {})
+    latest = [since] if since else []
+
+    new_fields = [field_id for field_id in field_ids if field_id not in seasons]
+    known_fields = [field_id for field_id in field_ids if field_id in seasons]
+    log_progress(f"Refreshing snapshot: {len(new_fields)} new fields, {len(known_fields)} known fields since {since}")
+
+    new_season_ids = set()
+    changed_seasons = get_seasons_since(new_fields, None) if new_fields else []
+    if known_fields:
+        changed_seasons += get_seasons_since(known_fields, since)
+    for field_id in new_fields:
+        seasons[field_id] = {}
+    for season in changed_seasons:
+        field_seasons = seasons.setdefault(season['fieldId'], {})
+        if season['id'] not in events_by_season:
+            new_season_ids.add(season['id'])
+        field_seasons[str(season['year'])] = season['id']
+        latest.append(season.get('updatedAt'))
+
+    known_season_ids = [
+        season_id
+        for field_id in known_fields
+        for season_id in seasons[field_id].values()
+        if season_id not in new_season_ids
+    ]
+    changed_events = get_events_since(list(new_season_ids), None) if new_season_ids else []
+    if known_season_ids:
+        changed_events += get_events_since(known_season_ids, since)
+
+    for season_id in new_season_ids:
+        events_by_season[season_id] = []
+    for event in changed_events:
+        season_events = events_by_season.setdefault(event['seasonId'], [])
+        season_events[:] = [e for e in season_events if e['id'] != event['id']]
+        season_events.append(event)
+        latest.append(event.get('updatedAt'))
+
+    latest = [ts for ts in latest if ts]
+    snapshot['high_water_mark'] = max(latest) if latest else since
+    log_progress(f"Merged {len(changed_seasons)} seasons and {len(changed_events)} events, high-water mark {snapshot['high_water_mark']}")
+    return snapshot
+
+def analyze_project_data(project_id: str, project_name: Optional[str] = None, full_refresh: bool = False) -> Dict[str, Any]:
     """Analyze data for a specific project across all years."""
     log_progress(f"Starting analysis for project {project_id}")
     project_data = {
@@ -316,7 +391,8 @@ def analyze_project_data(project_id: str) -> Dict[str, Any]:
     log_progress(f"Found {len(current_producers)} current producers")
     project_data['total_producers'] = len(current_producers)
     
-    # Process each producer
+    # Collect current fields for every producer
+    all_fields = []
     for i, producer in enumerate(current_producers, 1):
         log_progress(f"Processing producer {i}/{len(current_producers)}: {producer.get('name', producer['id'])}")
         
@@ -328,59 +404,71 @@ def analyze_project_data(project_id: str) -> Dict[str, Any]:
             
         log_progress(f"Found {len(current_fields)} fields", indent=1)
         project_data['total_fields'] += len(current_fields)
+        all_fields.extend(current_fields)
+    
+    # Pull only seasons and events changed since the last run
+    snapshot_name = project_name or project_id
+    snapshot = {'high_water_mark': None, 'seasons': {}, 'events': {}} if full_refresh else load_snapshot(snapshot_name)
+    snapshot = refresh_snapshot(snapshot, [field['id'] for field in all_fields])
+    save_snapshot(snapshot_name, snapshot)
+    project_data['snapshot_name'] = snapshot_name
+    project_data['fields'] = [
+        {'id': field['id'], 'name': field.get('name'), 'acres': field.get('acres')}
+        for field in all_fields
+    ]
+    
+    # Process each field's historical data from the snapshot
+    for j, field in enumerate(all_fields, 1):
+        log_progress(f"Processing field {j}/{len(all_fields)}: {field.get('name', field['id'])}", indent=2)
+        field_seasons = snapshot['seasons'].get(field['id'], {})
         
-        # Process each field's historical data
-        for j, field in enumerate(current_fields, 1):
-            log_progress(f"Processing field {j}/{len(current_fields)}: {field.get('name', field['id'])}", indent=2)
+        # Check each year for this field
+        for year in ANALYSIS_YEARS:
+            season_id = field_seasons.get(str(year))
+            if not season_id:
+                continue
+                
+            events = snapshot['events'].get(season_id, [])
+            if not events:
+                continue
             
-            # Check each year for this field
-            for year in ANALYSIS_YEARS:
-                log_progress(f"Checking year {year}", indent=3)
-                season_id = get_season_id(field['id'], year)
-                if not season_id:
-                    log_progress("No season ID found, skipping", indent=4)
-                    continue
-                    
-                events = get_field_events(season_id)
-                if not events:
-                    log_progress("No events found, skipping", indent=4)
-                    continue
+            # Update year data
+            year_data = project_data['years'][year]
+            year_data['fields'] += 1
+            year_data['producers'] = max(year_data['producers'], 1)  # Count producer only once per year
+            year_data['total_acres'] += float(field.get('acres', 0))
+            
+            has_cover_crop = False
+            for event in events:
+                # Count cover crop events
+                if event.get('coverCropSeedingRate'):
+                    has_cover_crop = True
+                    year_data['cover_crop_acres'] += float(field.get('acres', 0))
                 
-                # Update year data
-                year_data = project_data['years'][year]
-                year_data['fields'] += 1
-                year_data['producers'] = max(year_data['producers'], 1)  # Count producer only once per year
-                year_data['total_acres'] += float(field.get('acres', 0))
+                # Count tillage events
+                if event.get('tillageDepth') or event.get('tillageDataId'):
+                    year_data['tillage_events'] += 1
                 
-                has_cover_crop = False
-                for event in events:
-                    # Count cover crop events
-                    if event.get('coverCropSeedingRate'):
-                        has_cover_crop = True
-                        year_data['cover_crop_acres'] += float(field.get('acres', 0))
-                    
-                    # Count tillage events
-                    if event.get('tillageDepth') or event.get('tillageDataId'):
-                        year_data['tillage_events'] += 1
-                    
-                    # Count fertilizer applications
-                    if event.get('fertilizerDataId'):
-                        year_data['fertilizer_applications'] += 1
-                    
-                    # Count pesticide applications
-                    if event.get('pesticideCount'):
-                        year_data['pesticide_applications'] += event['pesticideCount']
-                
-                if has_cover_crop:
-                    year_data['fields_with_cover_crops'] += 1
-                else:
-                    year_data['fields_without_cover_crops'] += 1
+                # Count fertilizer applications
+                if event.get('fertilizerDataId'):
+                    year_data['fertilizer_applications'] += 1
                 
-                log_progress(f"Year {year} summary for field:", indent=4)
-                log_progress(f"Cover crop acres: {year_data['cover_crop_acres']:.1f}", indent=5)
-                log_progress(f"Tillage events: {year_data['tillage_events']}", indent=5)
-                log_progress(f"Fertilizer applications: {year_data['fertilizer_applications']}", indent=5)
-                log_progress(f"Pesticide applications: {year_data['pesticide_applications']}", indent=5)
+                # Count pesticide applications
+                if event.get('pesticideCount'):
+                    year_data['pesticide_applications'] += event['pesticideCount']
+            
+            if has_cover_crop:
+                year_data['fields_with_cover_crops'] += 1
+            else:
+                year_data['fields_without_cover_crops'] += 1
+    
+    for year in ANALYSIS_YEARS:
+        year_data = project_data['years'][year]
+        log_progress(f"Year {year} summary:", indent=1)
+        log_progress(f"Cover crop acres: {year_data['cover_crop_acres']:.1f}", indent=2)
+        log_progress(f"Tillage events: {year_data['tillage_events']}", indent=2)
+        log_progress(f"Fertilizer applications: {year_data['fertilizer_applications']}", indent=2)
+        log_progress(f"Pesticide applications: {year_data['pesticide_applications']}", indent=2)
     
     return project_data
 
@@ -516,153 +604,288 @@ def generate_trend_report(trends: Dict[str, Any], project_name: str) -> str:
     
     return report
 
-def export_to_csv(all_projects_data: Dict[str, Dict[str, Any]], combined_data: Dict[str, Any]) -> None:
-    """Export analysis results to Excel file with multiple sheets."""
+def year_rows(years: Dict[int, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Build the per-year detail rows for a project or the combined data."""
+    return [
+        {
+            'Year': year,
+            'Producers': data['producers'],
+            'Fields': data['fields'],
+            'Total_Acres': data['total_acres'],
+            'Cover_Crop_Acres': data['cover_crop_acres'],
+            'Cover_Crop_Percentage': data['cover_crop_acres'] / data['total_acres'] * 100 if data['total_acres'] > 0 else 0,
+            'Fields_with_Cover_Crops': data['fields_with_cover_crops'],
+            'Fields_without_Cover_Crops': data['fields_without_cover_crops'],
+            'Tillage_Events': data['tillage_events'],
+            'Fertilizer_Applications': data['fertilizer_applications'],
+            'Pesticide_Applications': data['pesticide_applications']
+        }
+        for year, data in years.items()
+    ]
+
+def rate_columns(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Cover crop share and per-field/per-acre practice rates for one year of data."""
+    return {
+        'Total_Acres': data['total_acres'],
+        'Cover_Crop_Acres': data['cover_crop_acres'],
+        'Cover_Crop_Percentage': data['cover_crop_acres'] / data['total_acres'] * 100 if data['total_acres'] > 0 else 0,
+        'Fields_with_Cover_Crops': data['fields_with_cover_crops'],
+        'Fields_without_Cover_Crops': data['fields_without_cover_crops'],
+        'Tillage_Events_per_Field': data['tillage_events'] / data['fields'] if data['fields'] > 0 else 0,
+        'Fertilizer_Apps_per_Field': data['fertilizer_applications'] / data['fields'] if data['fields'] > 0 else 0,
+        'Pesticide_Apps_per_Field': data['pesticide_applications'] / data['fields'] if data['fields'] > 0 else 0,
+        'Tillage_Events_per_Acre': data['tillage_events'] / data['total_acres'] if data['total_acres'] > 0 else 0,
+        'Fertilizer_Apps_per_Acre': data['fertilizer_applications'] / data['total_acres'] if data['total_acres'] > 0 else 0,
+        'Pesticide_Apps_per_Acre': data['pesticide_applications'] / data['total_acres'] if data['total_acres'] > 0 else 0
+    }
+
+def project_summary_rows(project_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Build the per-year summary rows for a project, skipping years without data."""
+    return [
+        {'Year': year, **rate_columns(project_data['years'][year])}
+        for year in ANALYSIS_YEARS
+        if year in project_data['years'] and project_data['years'][year]['fields'] > 0
+    ]
+
+def latest_summary_row(project_name: str, latest_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a Project_Summary row from the most recent year's data."""
+    return {
+        'Project': project_name,
+        'Total_Producers': latest_data['producers'],
+        'Total_Fields': latest_data['fields'],
+        **rate_columns(latest_data)
+    }
+
+def trend_rows(all_projects_data: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Build year-over-year percentage change rows for every project."""
+    def pct_change(current, previous, key):
+        return ((current[key] - previous[key]) / previous[key] * 100) if previous[key] > 0 else 0
+
+    rows = []
+    for project_name, project_data in all_projects_data.items():
+        for year in ANALYSIS_YEARS:
+            if year in project_data['years'] and year-1 in project_data['years']:
+                current = project_data['years'][year]
+                previous = project_data['years'][year-1]
+                rows.append({
+                    'Project': project_name,
+                    'Year': year,
+                    'Cover_Crop_Acres_Change': pct_change(current, previous, 'cover_crop_acres'),
+                    'Cover_Crop_Fields_Change': pct_change(current, previous, 'fields_with_cover_crops'),
+                    'Tillage_Events_Change': pct_change(current, previous, 'tillage_events'),
+                    'Fertilizer_Apps_Change': pct_change(current, previous, 'fertilizer_applications'),
+                    'Pesticide_Apps_Change': pct_change(current, previous, 'pesticide_applications')
+                })
+    return rows
+
+def iter_field_detail_rows(project_name: str, project_data: Dict[str, Any]):
+    """
+    Yield one event-level audit row per field season event, read from the
+    project's snapshot so only one project's events are held in memory.
+    Seasons without events yield a single row with empty event columns.
+    """
+    if not project_data.get('fields'):
+        return
+    snapshot = load_snapshot(project_data['snapshot_name'])
+    for field in project_data['fields']:
+        field_seasons = snapshot['seasons'].get(field['id'], {})
+        for year in ANALYSIS_YEARS:
+            season_id = field_seasons.get(str(year))
+            if not season_id:
+                continue
+            base = {
+                'Project': project_name,
+                'Field_ID': field['id'],
+                'Field_Name': field['name'],
+                'Acres': float(field['acres'] or 0),
+                'Year': year,
+                'Season_ID': season_id
+            }
+            events = snapshot['events'].get(season_id) or [{}]
+            for event in events:
+                fertilizer = event.get('fertilizer_datum') or {}
+                fertilizer_info = FERTILIZER_MAP.get(fertilizer.get('fertilizerId'), {})
+                tillage_types = [
+                    TILLAGE_TYPE_MAP.get(t['tillageTypeId'], str(t['tillageTypeId']))
+                    for t in event.get('many_event_data_has_many_tillage_types') or []
+                ]
+                yield {
+                    **base,
+                    'Event_ID': event.get('id'),
+                    'Done_At': event.get('doneAt'),
+                    'Cover_Crop_Seeding_Rate': event.get('coverCropSeedingRate'),
+                    'Cover_Crop_Termination_Type_ID': event.get('coverCropTerminationTypeId'),
+                    'Cover_Crop_Seeded_Aerially': event.get('isCoverCropSeededAerially'),
+                    'Tillage_Depth': event.get('tillageDepth'),
+                    'Tillage_Types': ", ".join(tillage_types) or None,
+                    'Fertilizer_Name': fertilizer_info.get('name'),
+                    'Fertilizer_Type': fertilizer_info.get('type'),
+                    'Fertilizer_Rate': fertilizer.get('rate'),
+                    'Application_Method_ID': fertilizer.get('applicationMethodId'),
+                    'Injection_Depth': fertilizer.get('injectionDepth'),
+                    'Pesticide_Count': event.get('pesticideCount')
+                }
+
+def iter_export_sheets(all_projects_data: Dict[str, Dict[str, Any]], combined_data: Dict[str, Any], include_details: bool = True):
+    """Yield (sheet_name, rows) pairs in workbook order; rows may be a generator."""
+    for project_name, project_data in all_projects_data.items():
+        yield f"{project_name[:30]}", year_rows(project_data['years'])
+        yield f"{project_name[:30]}_Summary", project_summary_rows(project_data)
+
+    yield 'All_Projects_Combined', year_rows(combined_data['years'])
+
+    # Most recent year's data (2024) for each project plus the combined total
+    summary = [
+        latest_summary_row(project_name, project_data['years'][2024])
+        for project_name, project_data in all_projects_data.items()
+    ]
+    summary.append(latest_summary_row('All Projects Combined', combined_data['years'][2024]))
+    yield 'Project_Summary', summary
+
+    yield 'Trend_Analysis', trend_rows(all_projects_data)
+
+    if include_details:
+        yield 'Field_Details', (
+            row
+            for project_name, project_data in all_projects_data.items()
+            for row in iter_field_detail_rows(project_name, project_data)
+        )
+
+def write_xlsx(filename: str, sheets) -> None:
+    """Stream sheets into a constant-memory xlsxwriter workbook."""
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(filename, {'constant_memory': True})
+    try:
+        for sheet_name, rows in sheets:
+            worksheet = None
+            sheet_index = 0
+            row_num = 0
+            columns = None
+            for row in rows:
+                # Roll over to a new sheet at Excel's row limit
+                if worksheet is None or row_num >= EXCEL_MAX_ROWS:
+                    sheet_index += 1
+                    name = sheet_name if sheet_index == 1 else f"{sheet_name[:28]}_{sheet_index}"
+                    worksheet = workbook.add_worksheet(name)
+                    columns = columns or list(row.keys())
+                    worksheet.write_row(0, 0, columns)
+                    row_num = 1
+                worksheet.write_row(row_num, 0, [row.get(column) for column in columns])
+                row_num += 1
+            if worksheet is None:
+                workbook.add_worksheet(sheet_name)
+    finally:
+        workbook.close()
+
+def write_csv(output_dir: str, sheets) -> None:
+    """Stream each sheet to its own CSV file."""
+    os.makedirs(output_dir, exist_ok=True)
+    for sheet_name, rows in sheets:
+        csv_path = os.path.join(output_dir, f"{sheet_name}.csv")
+        with open(csv_path, 'w', newline='') as f:
+            writer = None
+            for row in rows:
+                if writer is None:
+                    writer = csv.DictWriter(f, fieldnames=list(row.keys()))
+                    writer.writeheader()
+                writer.writerow(row)
+
+def write_parquet(output_dir: str, sheets, batch_size: int = EXPORT_BATCH_SIZE) -> None:
+    """Stream each sheet to its own Parquet file in row batches."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    os.makedirs(output_dir, exist_ok=True)
+    for sheet_name, rows in sheets:
+        parquet_path = os.path.join(output_dir, f"{sheet_name}.parquet")
+        schema = field_detail_schema() if sheet_name == 'Field_Details' else None
+        writer = None
+        batch = []
+
+        def flush():
+            nonlocal writer, schema
+            table = pa.Table.from_pylist(batch, schema=schema)
+            if writer is None:
+                schema = table.schema
+                writer = pq.ParquetWriter(parquet_path, schema)
+            writer.write_table(table)
+            batch.clear()
+
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+        if writer is not None:
+            writer.close()
+
+def field_detail_schema():
+    """Arrow schema for the Field_Details sheet, so sparse batches keep stable types."""
+    import pyarrow as pa
+
+    return pa.schema([
+        ('Project', pa.string()),
+        ('Field_ID', pa.string()),
+        ('Field_Name', pa.string()),
+        ('Acres', pa.float64()),
+        ('Year', pa.int16()),
+        ('Season_ID', pa.string()),
+        ('Event_ID', pa.string()),
+        ('Done_At', pa.string()),
+        ('Cover_Crop_Seeding_Rate', pa.float64()),
+        ('Cover_Crop_Termination_Type_ID', pa.int32()),
+        ('Cover_Crop_Seeded_Aerially', pa.bool_()),
+        ('Tillage_Depth', pa.float64()),
+        ('Tillage_Types', pa.string()),
+        ('Fertilizer_Name', pa.string()),
+        ('Fertilizer_Type', pa.string()),
+        ('Fertilizer_Rate', pa.float64()),
+        ('Application_Method_ID', pa.int32()),
+        ('Injection_Depth', pa.float64()),
+        ('Pesticide_Count', pa.int32())
+    ])
+
+def export_to_csv(all_projects_data: Dict[str, Dict[str, Any]], combined_data: Dict[str, Any],
+                  export_format: str = 'xlsx', include_details: bool = True) -> None:
+    """
+    Export analysis results as an Excel workbook, or one CSV/Parquet file per sheet.
+
+    Rows are streamed to disk as they are produced, so the event-level
+    Field_Details sheet never has to fit in memory.
+    """
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     output_dir = "gmi_analysis_results"
     
     # Create output directory if it doesn't exist
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
     
-    # Create Excel writer
-    excel_filename = f"{output_dir}/GMI_Analysis_{timestamp}.xlsx"
-    with pd.ExcelWriter(excel_filename, engine='openpyxl') as writer:
-        # Export individual project data to separate sheets
-        for project_name, project_data in all_projects_data.items():
-            # Create detailed data sheet
-            df = pd.DataFrame([
-                {
-                    'Year': year,
-                    'Producers': data['producers'],
-                    'Fields': data['fields'],
-                    'Total_Acres': data['total_acres'],
-                    'Cover_Crop_Acres': data['cover_crop_acres'],
-                    'Cover_Crop_Percentage': data['cover_crop_acres'] / data['total_acres'] * 100 if data['total_acres'] > 0 else 0,
-                    'Fields_with_Cover_Crops': data['fields_with_cover_crops'],
-                    'Fields_without_Cover_Crops': data['fields_without_cover_crops'],
-                    'Tillage_Events': data['tillage_events'],
-                    'Fertilizer_Applications': data['fertilizer_applications'],
-                    'Pesticide_Applications': data['pesticide_applications']
-                }
-                for year, data in project_data['years'].items()
-            ])
-            df.to_excel(writer, sheet_name=f"{project_name[:30]}", index=False)
-            
-            # Create project summary sheet
-            summary_data = []
-            for year in ANALYSIS_YEARS:
-                if year in project_data['years']:
-                    data = project_data['years'][year]
-                    if data['fields'] > 0:  # Only include years with data
-                        summary_data.append({
-                            'Year': year,
-                            'Total_Acres': data['total_acres'],
-                            'Cover_Crop_Acres': data['cover_crop_acres'],
-                            'Cover_Crop_Percentage': data['cover_crop_acres'] / data['total_acres'] * 100 if data['total_acres'] > 0 else 0,
-                            'Fields_with_Cover_Crops': data['fields_with_cover_crops'],
-                            'Fields_without_Cover_Crops': data['fields_without_cover_crops'],
-                            'Tillage_Events_per_Field': data['tillage_events'] / data['fields'] if data['fields'] > 0 else 0,
-                            'Fertilizer_Apps_per_Field': data['fertilizer_applications'] / data['fields'] if data['fields'] > 0 else 0,
-                            'Pesticide_Apps_per_Field': data['pesticide_applications'] / data['fields'] if data['fields'] > 0 else 0,
-                            'Tillage_Events_per_Acre': data['tillage_events'] / data['total_acres'] if data['total_acres'] > 0 else 0,
-                            'Fertilizer_Apps_per_Acre': data['fertilizer_applications'] / data['total_acres'] if data['total_acres'] > 0 else 0,
-                            'Pesticide_Apps_per_Acre': data['pesticide_applications'] / data['total_acres'] if data['total_acres'] > 0 else 0
-                        })
-            
-            summary_df = pd.DataFrame(summary_data)
-            summary_df.to_excel(writer, sheet_name=f"{project_name[:30]}_Summary", index=False)
-        
-        # Export combined data
-        combined_df = pd.DataFrame([
-            {
-                'Year': year,
-                'Producers': data['producers'],
-                'Fields': data['fields'],
-                'Total_Acres': data['total_acres'],
-                'Cover_Crop_Acres': data['cover_crop_acres'],
-                'Cover_Crop_Percentage': data['cover_crop_acres'] / data['total_acres'] * 100 if data['total_acres'] > 0 else 0,
-                'Fields_with_Cover_Crops': data['fields_with_cover_crops'],
-                'Fields_without_Cover_Crops': data['fields_without_cover_crops'],
-                'Tillage_Events': data['tillage_events'],
-                'Fertilizer_Applications': data['fertilizer_applications'],
-                'Pesticide_Applications': data['pesticide_applications']
-            }
-            for year, data in combined_data['years'].items()
-        ])
-        combined_df.to_excel(writer, sheet_name='All_Projects_Combined', index=False)
-        
-        # Create comprehensive summary sheet
-        summary_rows = []
-        for project_name, project_data in all_projects_data.items():
-            # Get the most recent year's data (2024)
-            latest_data = project_data['years'][2024]
-            summary_rows.append({
-                'Project': project_name,
-                'Total_Producers': latest_data['producers'],
-                'Total_Fields': latest_data['fields'],
-                'Total_Acres': latest_data['total_acres'],
-                'Cover_Crop_Acres': latest_data['cover_crop_acres'],
-                'Cover_Crop_Percentage': latest_data['cover_crop_acres'] / latest_data['total_acres'] * 100 if latest_data['total_acres'] > 0 else 0,
-                'Fields_with_Cover_Crops': latest_data['fields_with_cover_crops'],
-                'Fields_without_Cover_Crops': latest_data['fields_without_cover_crops'],
-                'Tillage_Events_per_Field': latest_data['tillage_events'] / latest_data['fields'] if latest_data['fields'] > 0 else 0,
-                'Fertilizer_Apps_per_Field': latest_data['fertilizer_applications'] / latest_data['fields'] if latest_data['fields'] > 0 else 0,
-                'Pesticide_Apps_per_Field': latest_data['pesticide_applications'] / latest_data['fields'] if latest_data['fields'] > 0 else 0,
-                'Tillage_Events_per_Acre': latest_data['tillage_events'] / latest_data['total_acres'] if latest_data['total_acres'] > 0 else 0,
-                'Fertilizer_Apps_per_Acre': latest_data['fertilizer_applications'] / latest_data['total_acres'] if latest_data['total_acres'] > 0 else 0,
-                'Pesticide_Apps_per_Acre': latest_data['pesticide_applications'] / latest_data['total_acres'] if latest_data['total_acres'] > 0 else 0
-            })
-        
-        # Add combined data to summary
-        latest_combined = combined_data['years'][2024]
-        summary_rows.append({
-            'Project': 'All Projects Combined',
-            'Total_Producers': latest_combined['producers'],
-            'Total_Fields': latest_combined['fields'],
-            'Total_Acres': latest_combined['total_acres'],
-            'Cover_Crop_Acres': latest_combined['cover_crop_acres'],
-            'Cover_Crop_Percentage': latest_combined['cover_crop_acres'] / latest_combined['total_acres'] * 100 if latest_combined['total_acres'] > 0 else 0,
-            'Fields_with_Cover_Crops': latest_combined['fields_with_cover_crops'],
-            'Fields_without_Cover_Crops': latest_combined['fields_without_cover_crops'],
-            'Tillage_Events_per_Field': latest_combined['tillage_events'] / latest_combined['fields'] if latest_combined['fields'] > 0 else 0,
-            'Fertilizer_Apps_per_Field': latest_combined['fertilizer_applications'] / latest_combined['fields'] if latest_combined['fields'] > 0 else 0,
-            'Pesticide_Apps_per_Field': latest_combined['pesticide_applications'] / latest_combined['fields'] if latest_combined['fields'] > 0 else 0,
-            'Tillage_Events_per_Acre': latest_combined['tillage_events'] / latest_combined['total_acres'] if latest_combined['total_acres'] > 0 else 0,
-            'Fertilizer_Apps_per_Acre': latest_combined['fertilizer_applications'] / latest_combined['total_acres'] if latest_combined['total_acres'] > 0 else 0,
-            'Pesticide_Apps_per_Acre': latest_combined['pesticide_applications'] / latest_combined['total_acres'] if latest_combined['total_acres'] > 0 else 0
-        })
-        
-        summary_df = pd.DataFrame(summary_rows)
-        summary_df.to_excel(writer, sheet_name='Project_Summary', index=False)
-        
-        # Create trend analysis sheet
-        trend_rows = []
-        for project_name, project_data in all_projects_data.items():
-            # Calculate year-over-year changes
-            for year in range(2020, 2025):  # Start from 2020 to have previous year for comparison
-                if year in project_data['years'] and year-1 in project_data['years']:
-                    current = project_data['years'][year]
-                    previous = project_data['years'][year-1]
-                    
-                    # Calculate percentage changes
-                    trend_rows.append({
-                        'Project': project_name,
-                        'Year': year,
-                        'Cover_Crop_Acres_Change': ((current['cover_crop_acres'] - previous['cover_crop_acres']) / previous['cover_crop_acres'] * 100) if previous['cover_crop_acres'] > 0 else 0,
-                        'Cover_Crop_Fields_Change': ((current['fields_with_cover_crops'] - previous['fields_with_cover_crops']) / previous['fields_with_cover_crops'] * 100) if previous['fields_with_cover_crops'] > 0 else 0,
-                        'Tillage_Events_Change': ((current['tillage_events'] - previous['tillage_events']) / previous['tillage_events'] * 100) if previous['tillage_events'] > 0 else 0,
-                        'Fertilizer_Apps_Change': ((current['fertilizer_applications'] - previous['fertilizer_applications']) / previous['fertilizer_applications'] * 100) if previous['fertilizer_applications'] > 0 else 0,
-                        'Pesticide_Apps_Change': ((current['pesticide_applications'] - previous['pesticide_applications']) / previous['pesticide_applications'] * 100) if previous['pesticide_applications'] > 0 else 0
-                    })
-        
-        trend_df = pd.DataFrame(trend_rows)
-        trend_df.to_excel(writer, sheet_name='Trend_Analysis', index=False)
+    sheets = iter_export_sheets(all_projects_data, combined_data, include_details)
+    if export_format == 'xlsx':
+        output_path = f"{output_dir}/GMI_Analysis_{timestamp}.xlsx"
+        write_xlsx(output_path, sheets)
+    elif export_format == 'csv':
+        output_path = f"{output_dir}/GMI_Analysis_{timestamp}"
+        write_csv(output_path, sheets)
+    elif export_format == 'parquet':
+        output_path = f"{output_dir}/GMI_Analysis_{timestamp}"
+        write_parquet(output_path, sheets)
+    else:
+        raise ValueError(f"Unsupported export format: {export_format}")
     
-    log_progress(f"Exported analysis to Excel file: {excel_filename}")
+    log_progress(f"Exported analysis ({export_format}) to: {output_path}")
 
 def main():
     """Main function to analyze all GMI projects."""
+    parser = argparse.ArgumentParser(description="Analyze GMI projects across ANALYSIS_YEARS")
+    parser.add_argument("--full-refresh", action="store_true",
+                        help="Ignore cached snapshots and re-pull every season and event")
+    parser.add_argument("--export-format", choices=["xlsx", "csv", "parquet"], default="xlsx",
+                        help="Output format for the exported results")
+    parser.add_argument("--no-field-details", action="store_true",
+                        help="Skip the event-level Field_Details export")
+    args = parser.parse_args()
     start_time = time.time()
     
     with setup_logging():
@@ -675,7 +898,7 @@ def main():
             start_time = time.time()
             
             try:
-                project_data = analyze_project_data(project_id)
+                project_data = analyze_project_data(project_id, project_name, full_refresh=args.full_refresh)
                 if project_data:  # Only add if we got valid data
                     all_projects_data[project_name] = project_data
                     
@@ -709,7 +932,8 @@ def main():
                 print(combined_trend_report)
                 
                 # Export to Excel
-                export_to_csv(all_projects_data, combined_data)
+                export_to_csv(all_projects_data, combined_data, args.export_format,
+                              include_details=not args.no_field_details)
             except Exception as e:
                 log_progress(f"Error in combined analysis: {str(e)}")
         else:
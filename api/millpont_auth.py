@@ -1,63 +1,150 @@
+import os
 import time
+import threading
 import requests
+from urllib.parse import urljoin
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+MILLPONT_URL = "https://api.meti.millpont.com/"
+
+
+class MillpontClient:
+    """
+    Shared, thread-safe Millpont API client.
+
+    One pooled requests.Session is used for every call. The token is
+    refreshed `refresh_margin` seconds before it expires, under a lock so
+    concurrent workers trigger a single /token request, and a 401 forces
+    one refresh and retry.
+    """
+
+    def __init__(self, email=None, password=None, base_url=MILLPONT_URL, pool_size=10, retries=3,
+                 backoff_factor=1.0, refresh_margin=300, timeout=120):
+        self.email = email or os.environ.get("MILLPONT_EMAIL", "email")
+        self.password = password or os.environ.get("MILLPONT_PASSWORD", "password")
+        self.base_url = base_url
+        self.refresh_margin = refresh_margin
+        self.timeout = timeout
+        self._token = None
+        self._auth_header = None
+        self._token_expiry = 0
+        self._lock = threading.Lock()
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "Accept": "application/json"
+        })
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET"],
+            respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("https://", adapter)
+
+    def _fetch_token(self):
+        """Request a new token; the caller must hold the lock."""
+        response = self.session.post(urljoin(self.base_url, "token"),
+                                     json={"email": self.email, "password": self.password},
+                                     timeout=self.timeout)
+        print(f"Token request status code: {response.status_code}")
+        if response.status_code != 200:
+            raise ValueError(f"Authentication failed: {response.text}")
+
+        try:
+            response_data = response.json()
+        except ValueError:
+            response_data = None
+
+        if isinstance(response_data, dict) and ("access_token" in response_data or "token" in response_data):
+            self._token = response_data.get("access_token") or response_data["token"]
+            self._auth_header = f"Bearer {self._token}"
+            expires_in = response_data.get("expires_in", 3600)  # Default to 1 hour if not specified
+        else:
+            # The endpoint can also return the raw token, which is sent unmodified
+            self._token = response.text.strip()
+            self._auth_header = self._token
+            expires_in = 3600
+        self._token_expiry = time.time() + expires_in
+
+    def _current_auth(self, force_refresh=False, stale_token=None):
+        """
+        Return (token, Authorization header), refreshing before expiry.
+
+        With force_refresh, the token is only replaced if it is still
+        `stale_token`, so a burst of 401s from parallel workers refreshes once.
+        """
+        if not force_refresh and self._token and time.time() < self._token_expiry - self.refresh_margin:
+            return self._token, self._auth_header
+        with self._lock:
+            needs_refresh = (
+                self._token is None
+                or time.time() >= self._token_expiry - self.refresh_margin
+                or (force_refresh and self._token == stale_token)
+            )
+            if needs_refresh:
+                self._fetch_token()
+            return self._token, self._auth_header
+
+    def authenticate(self):
+        """Fetch a token up front so configuration errors surface immediately."""
+        self._current_auth()
+        return self
+
+    def request(self, method, endpoint, **kwargs):
+        """Send an authenticated request to an endpoint path or absolute URL."""
+        url = urljoin(self.base_url, endpoint)
+        kwargs.setdefault("timeout", self.timeout)
+        extra_headers = kwargs.pop("headers", {})
+        token, auth_header = self._current_auth()
+        response = self.session.request(method, url, headers={**extra_headers, "Authorization": auth_header}, **kwargs)
+        if response.status_code == 401:
+            token, auth_header = self._current_auth(force_refresh=True, stale_token=token)
+            response = self.session.request(method, url, headers={**extra_headers, "Authorization": auth_header}, **kwargs)
+        return response
+
+    def get(self, endpoint, **kwargs):
+        return self.request("GET", endpoint, **kwargs)
+
+    def post(self, endpoint, **kwargs):
+        return self.request("POST", endpoint, **kwargs)
+
+
+# Shared client for scripts that only need one
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide MillpontClient, creating it on first use."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = MillpontClient()
+        return _default_client
 
-# Token management
-token = None
-token_expiry = 0
-
-def get_token():
-    global token, token_expiry
-    url = "https://api.meti.millpont.com/token"
-    payload = {
-        "email": "email",
-        "password": "password"
-    }
-    response = requests.post(url, json=payload)
-    
-    # Print response for debugging
-    print(f"Status code: {response.status_code}")
-    print(f"Response content: {response.text}")
-    
-    response_data = response.json()
-    
-    # Check if the expected keys are in the response
-    if "access_token" in response_data:
-        token = response_data["access_token"]
-        token_expiry = time.time() + response_data.get("expires_in", 3600)  # Default to 1 hour if not specified
-    elif "token" in response_data:
-        token = response_data["token"]
-        token_expiry = time.time() + response_data.get("expires_in", 3600)  # Default to 1 hour if not specified
-    else:
-        raise ValueError(f"Authentication failed: {response_data.get('error', 'Unknown error')}")
 
 def make_authenticated_request(endpoint, method="GET", data=None):
-    global token, token_expiry
-    if token is None or time.time() >= token_expiry:
-        get_token()  # Refresh the token
-    
-    headers = {"Authorization": f"Bearer {token}"}
-    url = f"https://api.meti.millpont.com/{endpoint}"
-    
     try:
-        if method == "GET":
-            response = requests.get(url, headers=headers)
-        elif method == "POST":
-            response = requests.post(url, json=data, headers=headers)
-        else:
-            raise ValueError(f"Unsupported HTTP method: {method}")
-        
+        response = get_client().request(method, endpoint, json=data)
         response.raise_for_status()  # Raise an exception for 4XX/5XX responses
         return response.json()
     except requests.exceptions.RequestException as e:
         print(f"Request error: {e}")
-        if hasattr(e.response, 'text'):
+        if getattr(e, 'response', None) is not None:
             print(f"Response content: {e.response.text}")
         raise
 
-# Example usage
-try:
-    get_token()  # Get the token initially
-    response = make_authenticated_request("sources", method="GET")
-    print(response)
-except Exception as e:
-    print(f"Error: {e}")
+
+if __name__ == "__main__":
+    # Example usage
+    try:
+        get_client().authenticate()
+        response = make_authenticated_request("sources", method="GET")
+        print(response)
+    except Exception as e:
+        print(f"Error: {e}")
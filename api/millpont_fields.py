@@ -1,211 +1,246 @@
-import time
-import requests
+import os
+import sys
 import json
 import csv
-from datetime import datetime
-
-# Token management
-token = None
-token_expiry = 0
-
-def get_token():
-    global token, token_expiry
-    url = "https://api.meti.millpont.com/token"
-    payload = {
-        "email": "EMAIL",
-        "password": "PASSWORD"
-    }
-    
-    # Create a session for consistent headers
-    session = requests.Session()
-    session.headers.update({
-        "Content-Type": "application/json",
-        "Accept": "application/json"
-    })
-    
-    response = session.post(url, json=payload)
-    print(f"Status code: {response.status_code}")
-    
-    if response.status_code == 200:
-        try:
-            # Store raw token without any modifications
-            token = response.text.strip()
-            token_expiry = time.time() + 3600
-            
-            # Set the raw token as the Authorization header
-            session.headers["Authorization"] = token
-            
-            # Test the token
-            test_response = session.get("https://api.meti.millpont.com/sources")
-            print(f"\nToken test:")
-            print(f"Status: {test_response.status_code}")
-            print(f"Response: {test_response.text}")
-            
-            if test_response.status_code == 200:
-                print("Token working correctly!")
-                return session
-            else:
-                raise ValueError("Token test failed")
-            
-        except Exception as e:
-            print(f"Error processing token: {str(e)}")
-            raise
-    else:
-        raise ValueError(f"Authentication failed: {response.text}")
+import argparse
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from millpont_auth import MillpontClient
 
-def standardize_geojson(field):
+# Shared modules live at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from geometry_normalize import normalize_geometries, summarize_report
+from geometry_export import compact_geometries, summarize_compaction, format_compaction
+from geojson_io import iter_features
+
+# One JSON result row per line, appended as soon as Millpont responds
+JOURNAL_PATH = 'millpont_journal.jsonl'
+
+def standardize_features(fields, tolerance=None, precision=None):
     """
-    Standardize a GeoJSON feature to match the required format:
-    - Remove CRS
-    - Fix coordinate structure
-    - Ensure proper nesting
-    - Ensure it's a Polygon type
+    Standardize GeoJSON features to the Millpont source format in bulk:
+    - Remove CRS and unwrap nested coordinate objects
+    - Close rings, fix orientation and make geometries valid
+    - Reduce MultiPolygons to their largest Polygon (dropped parts are reported)
+    - Optionally simplify (tolerance, in degrees) and round coordinates (precision)
+
+    Returns (features, report); a feature is None when its geometry could not
+    be repaired. With compaction each report entry carries its "compaction"
+    entry. Input fields are not modified.
     """
-    try:
-        # Get the geometry
-        geometry = field["geometry"]
-        
-        # Extract coordinates, handling both direct and nested formats
-        if isinstance(geometry["coordinates"], dict):
-            # Handle nested format with type and crs
-            coordinates = geometry["coordinates"].get("coordinates", [])
-        else:
-            coordinates = geometry["coordinates"]
-        
-        # Ensure we have the right nesting level for a Polygon
-        # We want: [[[x1,y1], [x2,y2], ...]] for a polygon
-        if isinstance(coordinates[0][0][0], list):  # Too many levels (MultiPolygon)
-            coordinates = coordinates[0]  # Take first polygon
-        
-        # Ensure it's a closed polygon
-        if coordinates[0][0] != coordinates[0][-1]:
-            coordinates[0].append(coordinates[0][0])
-        
-        # Create standardized geometry
-        standardized_geometry = {
-            "type": "Polygon",
-            "coordinates": coordinates
-        }
-        
-        # Create standardized feature
-        standardized_feature = {
+    geometries, report = normalize_geometries([field.get("geometry") for field in fields], output_type="Polygon")
+    if tolerance is not None or precision is not None:
+        acres = [field["properties"].get("acres") for field in fields]
+        geometries, compaction = compact_geometries(geometries, acres, tolerance=tolerance, precision=precision)
+        for entry, compaction_entry in zip(report, compaction):
+            entry["compaction"] = compaction_entry
+    features = [
+        {
             "type": "Feature",
             "id": field["properties"]["id"],
             "properties": {
                 "start_at": "2024-01-01T00:00:00.000Z",
                 "end_at": "2024-12-31T23:59:59.999Z"
             },
-            "geometry": standardized_geometry
+            "geometry": geometry
+        } if geometry else None
+        for field, geometry in zip(fields, geometries)
+    ]
+    return features, report
+
+def standardize_geojson(field):
+    """Standardize a single GeoJSON feature; see standardize_features."""
+    features, report = standardize_features([field])
+    if features[0] is None:
+        raise ValueError(f"Unusable geometry ({report[0]['status']}) for field {field['properties'].get('id')}")
+    return features[0]
+
+def list_existing_sources(client, page_size=None):
+    """
+    Map every field ID already registered in Millpont to its source ID.
+
+    Fetches /sources once, or page by page with limit/offset when page_size
+    is set, instead of re-listing all sources for every field.
+    """
+    existing = {}
+    offset = 0
+    while True:
+        params = {"limit": page_size, "offset": offset} if page_size else None
+        response = client.get("sources", params=params)
+        response.raise_for_status()
+        sources = response.json()
+        for source in sources:
+            if 'feature_collection' in source:
+                for feature in source['feature_collection'].get('features', []):
+                    if feature.get('id') is not None:
+                        existing[feature['id']] = source['id']
+        if not page_size or len(sources) < page_size:
+            return existing
+        offset += page_size
+
+def result_row(field, status, source=None, error_message=None):
+    """Build one millpont_results.csv row for a field."""
+    source = source or {}
+    return {
+        'field_id': field["properties"].get("id", "unknown"),
+        'field_name': field["properties"].get("name", "unknown"),
+        'millpont_source_id': source.get('id'),
+        'created_at': source.get('created_at'),
+        'processed': source.get('processed', False) if status == 'success' else None,
+        'created_by': source.get('created_by'),
+        'status': status,
+        'error_message': error_message
+    }
+
+def match_sources(batch, sources):
+    """
+    Pair each submitted field with the source that registered it.
+
+    Sources are matched on the feature IDs in their feature_collection,
+    otherwise positionally when one source came back per feature. Fields
+    that cannot be matched get None, so they are journaled as errors and
+    picked up again by --retry-errors.
+    """
+    by_field_id = {}
+    for source in sources:
+        for feature in source.get('feature_collection', {}).get('features', []):
+            by_field_id[feature.get('id')] = source
+    if by_field_id:
+        return [(field, by_field_id.get(field["properties"]["id"])) for field in batch]
+    if len(sources) == len(batch):
+        return list(zip(batch, sources))
+    return [(field, None) for field in batch]
+
+def submit_batch(client, batch, features):
+    """POST a batch of fields and their standardized features as one FeatureCollection and return result rows."""
+    try:
+        feature_collection = {
+            "type": "FeatureCollection",
+            "features": features
         }
-        
-        return standardized_feature
-        
+        response = client.post("sources", json=feature_collection)
+        print(f"Batch of {len(batch)} fields: response status {response.status_code}")
+        if response.status_code != 200:
+            raise Exception(f"API Error: {response.text}")
+
+        response_data = response.json()
+        if not isinstance(response_data, list) or len(response_data) == 0:
+            raise Exception("Unexpected response format")
+
+        results = []
+        for field, source in match_sources(batch, response_data):
+            if source is None:
+                results.append(result_row(field, 'error', error_message="No source matched to field"))
+            else:
+                results.append(result_row(field, 'success', source))
+        return results
     except Exception as e:
-        print(f"Error standardizing feature: {e}")
-        print(f"Original feature: {json.dumps(field, indent=2)}")
-        raise
+        print(f"Error processing batch starting at field {batch[0]['properties'].get('name', 'unknown')}: {str(e)}")
+        return [result_row(field, 'error', error_message=str(e)) for field in batch]
 
-def create_millpont_feature(field):
-    """Convert a field from CIFCSC to Millpont format"""
-    # First standardize the GeoJSON
-    standardized = standardize_geojson(field)
-    return standardized
+def load_journal(journal_path):
+    """
+    Replay the upload journal into the latest result row per field ID.
 
-def check_source_exists(session, field_id):
-    """Check if a source already exists for the given field ID"""
-    url = f"https://api.meti.millpont.com/sources"
+    A partially written last line (from a crash mid-append) is ignored.
+    """
+    latest = {}
     try:
-        response = session.get(url)
-        if response.status_code == 200:
-            sources = response.json()
-            # Look through the feature collections to find matching field ID
-            for source in sources:
-                if 'feature_collection' in source:
-                    features = source['feature_collection'].get('features', [])
-                    for feature in features:
-                        if feature.get('id') == field_id:
-                            return True, source['id']
-        return False, None
-    except Exception as e:
-        print(f"Error checking source existence: {e}")
-        return False, None
+        with open(journal_path, 'r') as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                latest[row['field_id']] = row
+    except FileNotFoundError:
+        pass
+    return latest
 
-def process_fields():
+def append_journal(journal_file, rows):
+    """Append result rows to the journal and flush them to disk immediately."""
+    recorded_at = datetime.now(timezone.utc).isoformat()
+    for row in rows:
+        journal_file.write(json.dumps({**row, 'recorded_at': recorded_at}) + "\n")
+    journal_file.flush()
+    os.fsync(journal_file.fileno())
+
+def process_fields(geojson_path='CIFCSC_2024.geojson', batch_size=50, max_workers=4, page_size=None,
+                   journal_path=JOURNAL_PATH, retry_errors=False, tolerance=None, precision=None, store=None,
+                   project=None, year=None):
     try:
-        session = get_token()
+        # One shared client: pooled connections and a single token refresh for all workers
+        client = MillpontClient(pool_size=max_workers).authenticate()
         
-        # Read the GeoJSON file
-        with open('CIFCSC_2024.geojson', 'r') as f:
-            data = json.load(f)
+        # Fields already registered by an earlier run are never resubmitted
+        journal = load_journal(journal_path)
+        print(f"Loaded {len(journal)} fields from journal {journal_path}")
         
-        # Process each field
-        results = []
-        for field in data["features"]:
-            try:
-                field_id = field["properties"]["id"]
-                field_name = field["properties"].get("name", "unknown")
-                
-                print(f"\nProcessing field: {field_name}")
-                
-                # Check if source already exists
-                exists, existing_source_id = check_source_exists(session, field_id)
-                
-                if exists:
-                    print(f"Field already exists with source ID: {existing_source_id}, skipping...")
-                    results.append({
-                        'field_id': field_id,
-                        'field_name': field_name,
-                        'millpont_source_id': existing_source_id,
-                        'created_at': None,  # We could get these details with another API call if needed
-                        'processed': None,
-                        'created_by': None,
-                        'status': 'skipped',
-                        'error_message': 'Already exists'
-                    })
+        # List registered sources once instead of once per field
+        existing = list_existing_sources(client, page_size)
+        print(f"Found {len(existing)} fields already registered")
+        
+        with open(journal_path, 'a') as journal_file:
+            new_fields = []
+            skipped = []
+            field_ids = []
+            # Stream the GeoJSON file (or the field store); only fields that still need submitting are kept
+            if store is not None:
+                store.sync(project, year)
+                source = store.iter_features(project, year)
+            else:
+                source = iter_features(geojson_path)
+            for field in source:
+                field_id = field["properties"].get("id")
+                field_ids.append(field_id)
+                previous = journal.get(field_id)
+                if previous and previous['status'] in ('success', 'skipped'):
                     continue
-                
-                feature_collection = {
-                    "type": "FeatureCollection",
-                    "features": [create_millpont_feature(field)]
-                }
-                
-                url = "https://api.meti.millpont.com/sources"
-                
-                # Make request using session with raw token
-                response = session.post(url, json=feature_collection)
-                print(f"Response status: {response.status_code}")
-                
-                if response.status_code == 200:
-                    response_data = response.json()
-                    if isinstance(response_data, list) and len(response_data) > 0:
-                        source = response_data[0]  # Get the first source object
-                        results.append({
-                            'field_id': field_id,
-                            'field_name': field_name,
-                            'millpont_source_id': source.get('id'),
-                            'created_at': source.get('created_at'),
-                            'processed': source.get('processed', False),
-                            'created_by': source.get('created_by'),
-                            'status': 'success'
-                        })
-                        print(f"Successfully created source with ID: {source.get('id')}")
-                    else:
-                        raise Exception("Unexpected response format")
+                if retry_errors and not (previous and previous['status'] == 'error'):
+                    continue
+                if field_id in existing:
+                    skipped.append(result_row(field, 'skipped', {'id': existing[field_id]}, 'Already exists'))
                 else:
-                    raise Exception(f"API Error: {response.text}")
-                
-            except Exception as e:
-                print(f"Error processing field {field_name}: {str(e)}")
-                results.append({
-                    'field_id': field_id,
-                    'field_name': field_name,
-                    'millpont_source_id': None,
-                    'created_at': None,
-                    'processed': None,
-                    'created_by': None,
-                    'status': 'error',
-                    'error_message': str(e)
-                })
+                    new_fields.append(field)
+            append_journal(journal_file, skipped)
+            
+            # Standardize every new geometry in one pass
+            features, report = standardize_features(new_fields, tolerance, precision)
+            print(f"Geometry standardization: {summarize_report(report)}")
+            compaction = [entry["compaction"] for entry in report if "compaction" in entry]
+            if compaction:
+                print(f"Export compaction for {geojson_path}: {format_compaction(summarize_compaction(compaction))}")
+            unusable = []
+            ready = []
+            for field, feature, entry in zip(new_fields, features, report):
+                if entry.get("dropped_parts") or entry["dropped_rings"]:
+                    print(f"Field {field['properties'].get('name', 'unknown')}: dropped {entry.get('dropped_parts', 0)} parts "
+                          f"and {entry['dropped_rings']} rings")
+                if feature is None:
+                    unusable.append(result_row(field, 'error', error_message=f"Unusable geometry ({entry['status']})"))
+                else:
+                    ready.append((field, feature))
+            append_journal(journal_file, unusable)
+            
+            # Submit new fields in multi-feature batches across a bounded worker pool
+            batches = [ready[i:i + batch_size] for i in range(0, len(ready), batch_size)]
+            mode = "failed" if retry_errors else "new"
+            print(f"Submitting {len(ready)} {mode} fields in {len(batches)} batches with {max_workers} workers")
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [
+                    executor.submit(submit_batch, client, [field for field, _ in batch], [feature for _, feature in batch])
+                    for batch in batches
+                ]
+                for future in as_completed(futures):
+                    append_journal(journal_file, future.result())
+        
+        # Report the latest journaled state of every field in this file
+        journal = load_journal(journal_path)
+        results = [
+            {k: v for k, v in journal[field_id].items() if k != 'recorded_at'}
+            for field_id in field_ids
+            if field_id in journal
+        ]
         
         # Save results to CSV with expanded columns
         if results:
@@ -241,7 +276,30 @@ def process_fields():
         raise
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Register GeoJSON fields as Millpont sources")
+    parser.add_argument("--input", default="CIFCSC_2024.geojson", help="GeoJSON FeatureCollection of fields")
+    parser.add_argument("--batch-size", type=int, default=50, help="Fields per submitted FeatureCollection")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent submissions")
+    parser.add_argument("--page-size", type=int, help="List existing sources in pages of this size")
+    parser.add_argument("--journal", default=JOURNAL_PATH, help="Append-only JSON lines upload journal")
+    parser.add_argument("--retry-errors", action="store_true",
+                        help="Only resubmit fields whose last journaled attempt failed")
+    parser.add_argument("--simplify-tolerance", type=float,
+                        help="Topology-preserving simplification tolerance in degrees (e.g. 0.00001)")
+    parser.add_argument("--precision", type=int, help="Round coordinates to this many decimals (e.g. 6)")
+    parser.add_argument("--store", help="Read fields from this local field store instead of --input")
+    parser.add_argument("--project", help="Project abbreviation to read from --store")
+    parser.add_argument("--year", type=int, help="Season year to read from --store")
+    args = parser.parse_args()
+    store = None
+    if args.store:
+        if not (args.project and args.year):
+            parser.error("--store requires --project and --year")
+        from field_store import FieldStore
+        store = FieldStore(args.store)
     try:
-        process_fields()
+        process_fields(args.input, args.batch_size, args.workers, args.page_size,
+                       args.journal, args.retry_errors, args.simplify_tolerance, args.precision,
+                       store, args.project, args.year)
     except Exception as e:
         print(f"Script failed: {str(e)}")
@@ -1,89 +1,237 @@
-import pandas as pd
+"""
+Carbon intensity (CI) scores per field from the verified flat files.
+
+The crop in each crop_yield string is converted to kg per acre with the
+versioned conversion table (crop_conversions.json), and the CI score is
+the field's total emissions per kg of crop. Each year's files are scored
+in their own process; field scores and per-project distributions (median,
+P10, P90) are written as Parquet datasets partitioned by year and
+project, tagged with the conversion table version, so dashboards can
+query them without re-scoring.
+
+Usage:
+    python ci_score.py 2022_Verified.csv 2023_Verified.csv 2023_Quantified.csv --output-dir ci_scores
+"""
+import os
 import re
+import json
+import shutil
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from verified_data import load_verified, read_header
 
-# Load the CSV file
+# Default input and the conversion table (kg per yield unit) shipped next to this script
 file_path = '2023_Verified.csv'
-df = pd.read_csv(file_path)
-
-# Define the crop_yields dictionary with conversion factors (kg per unit)
-crop_yields = {
-    "Wheat, Winter": {"unit": "bushels", "kg_per_unit": 27.21},
-    "Soybeans": {"unit": "bushels", "kg_per_unit": 27.21},
-    "Corn, Grain": {"unit": "bushels", "kg_per_unit": 25.4},
-    "Sunflowers": {"unit": "pounds", "kg_per_unit": 0.453592},
-    "Oats": {"unit": "bushels", "kg_per_unit": 14.51},
-    "Sorghum, Grain": {"unit": "bushels", "kg_per_unit": 25.4},
-    "Cotton": {"unit": "lbs", "kg_per_unit": 0.453592},
-    "Pea, Chinese Red/Cowpea": {"unit": "bushels", "kg_per_unit": 27.21},
-    "Wheat, Spring": {"unit": "bushels", "kg_per_unit": 27.21},
-    "Barley": {"unit": "bushels", "kg_per_unit": 21.77},
-    "Rye": {"unit": "bushels", "kg_per_unit": 25.4},
-    "Beans, Dry": {"unit": "bushels", "kg_per_unit": 27.21}
-}
-
-# Function to extract the crop name from the crop_yield column
-def extract_crop_name(crop_yield_str):
-    try:
-        # Extract the crop name (e.g., "Soybeans" from "Crop- (Soybeans: Yield- 36.90 bushels/acre Type-normal)")
-        crop_name = re.search(r'Crop-\s*\(([^:]+):', crop_yield_str).group(1)
-        return crop_name.strip()
-    except (AttributeError, ValueError):
+CONVERSION_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'crop_conversions.json')
+OUTPUT_DIR = 'ci_scores'
+
+# Crop name, yield and unit from a crop_yield string such as
+# "Crop- (Soybeans: Yield- 36.90 bushels/acre Type-normal)"; each part is
+# optional and found independently, like separate re.search calls
+CROP_YIELD_PATTERN = re.compile(
+    r'^(?:(?=.*?Crop-\s*\((?P<crop_name>[^:]+):))?'
+    r'(?:(?=.*?Yield-\s*(?P<yield_value>[\d.]+)))?'
+    r'(?:(?=.*?(?P<yield_unit>bushels|pounds)/acre))?',
+    re.DOTALL
+)
+
+# Emissions columns converted with a factor of 0.001 (tonne-to-kg); field_practice_emissions is added as is.
+# Quantified files carry the unadjusted n2o_indirect and methane columns instead.
+SCALED_EMISSIONS = ["n2o_direct", "n2o_indirect_adjusted", "methane_adjusted"]
+QUANTIFIED_EMISSIONS = ["n2o_direct", "n2o_indirect", "methane"]
+# Identifying columns carried into the field scores when the file has them
+ID_COLUMNS = ["Project", "Field ID", "Field Name (MRV)", "Commodity"]
+RESULT_COLUMNS = ["crop_yield", "crop_name", "yield_value", "yield_unit", "crop_weight", "total_emissions", "ci_score"]
+DISTRIBUTION_COLUMNS = ["fields_scored", "ci_median", "ci_p10", "ci_p90"]
+
+_tables = {}
+
+
+def conversion_table(crop_yields):
+    """crop_yields dict as a DataFrame indexed by crop name (unit, kg_per_unit)."""
+    table = pd.DataFrame.from_dict(crop_yields, orient="index")
+    table.index.name = "crop_name"
+    return table
+
+
+def load_conversion_table(path=CONVERSION_TABLE_PATH):
+    """
+    Read a conversion table file, once per process.
+
+    Returns:
+        tuple: (table DataFrame, version) from a JSON file with "version"
+        and "crops" ({crop name: {"unit", "kg_per_unit"}})
+    """
+    if path not in _tables:
+        with open(path) as f:
+            data = json.load(f)
+        _tables[path] = (conversion_table(data["crops"]), data["version"])
+    return _tables[path]
+
+
+def parse_crop_yield(crop_yield):
+    """
+    Crop name, numeric yield and unit of every crop_yield string in one pass.
+
+    Missing or malformed parts are NaN (a yield such as "1.2.3" included).
+    """
+    parts = crop_yield.astype("string").str.extract(CROP_YIELD_PATTERN)
+    parts["crop_name"] = parts["crop_name"].str.strip()
+    parts["yield_value"] = pd.to_numeric(parts["yield_value"], errors="coerce")
+    return parts
+
+
+def emissions_columns(batch):
+    """Emissions columns scaled by 0.001 for a batch (Verified or Quantified)."""
+    return QUANTIFIED_EMISSIONS if batch == "Quantified" else SCALED_EMISSIONS
+
+
+def score(df, table, scaled_emissions=SCALED_EMISSIONS):
+    """
+    Add crop_name, yield_value, yield_unit, crop_weight, total_emissions and ci_score columns.
+
+    crop_weight (kg per acre) is the yield times the crop's kg_per_unit when
+    the crop is in the conversion table and the yield is in its unit;
+    ci_score is the total emissions per kg of crop, NaN without a weight.
+    """
+    parts = parse_crop_yield(df["crop_yield"])
+    factors = parts.join(table, on="crop_name")
+    unit_matches = factors["yield_unit"].eq(factors["unit"]).fillna(False).astype(bool)
+    crop_weight = (factors["yield_value"] * factors["kg_per_unit"]).where(unit_matches)
+
+    total_emissions = df["field_practice_emissions"].copy()
+    for column in scaled_emissions:
+        total_emissions += df[column] * 0.001
+
+    scored = df.copy()
+    scored[["crop_name", "yield_value", "yield_unit"]] = parts
+    scored["crop_weight"] = crop_weight
+    scored["total_emissions"] = total_emissions
+    scored["ci_score"] = (total_emissions / crop_weight).where(crop_weight != 0)
+    return scored
+
+
+def score_distributions(scored, keys=("batch", "Project")):
+    """Per-group count of scored fields and CI score median, P10 and P90."""
+    keys = [key for key in keys if key in scored]
+    scored = scored.dropna(subset=["ci_score"])
+    if scored.empty:
+        return pd.DataFrame(columns=keys + DISTRIBUTION_COLUMNS)
+    grouped = scored.groupby(keys, observed=True)["ci_score"]
+    quantiles = grouped.quantile([0.1, 0.5, 0.9]).unstack()
+    quantiles.columns = ["ci_p10", "ci_median", "ci_p90"]
+    distributions = grouped.size().rename("fields_scored").to_frame().join(quantiles)
+    return distributions[DISTRIBUTION_COLUMNS].reset_index()
+
+
+def file_year(path):
+    """Year and batch of a flat file named <year>_<batch>.csv."""
+    year, batch = os.path.splitext(os.path.basename(path))[0].split('_')[:2]
+    return int(year), batch
+
+
+def score_file(path, table, all_columns=False):
+    """
+    Score one flat file with its batch's emissions columns.
+
+    Only the ID and scoring columns are loaded unless all_columns is set.
+    """
+    batch = file_year(path)[1]
+    scaled_emissions = emissions_columns(batch)
+    columns = None
+    if not all_columns:
+        headers = read_header(path)
+        columns = ([column for column in ID_COLUMNS if column in headers]
+                   + ["crop_yield", "field_practice_emissions"] + scaled_emissions)
+    scored = score(load_verified(path, columns=columns), table, scaled_emissions)
+    return batch, scored
+
+
+def write_partitioned(df, dataset_dir, year):
+    """Replace a year's partition of a Parquet dataset, partitioned by project."""
+    year_dir = os.path.join(dataset_dir, f"year={year}")
+    shutil.rmtree(year_dir, ignore_errors=True)
+    if df.empty:
         return None
+    df = df.assign(Project=df["Project"].astype(str)) if "Project" in df else df
+    df.to_parquet(year_dir, index=False, partition_cols=["Project"] if "Project" in df else None)
+    return year_dir
+
+
+def score_year(year, paths, table_path=CONVERSION_TABLE_PATH, output_dir=OUTPUT_DIR, write_csv=False):
+    """
+    Score one year's files and write its field scores and distributions.
+
+    Field scores keep the ID and result columns, so Verified and Quantified
+    files share one schema. With write_csv each file's full rows plus the
+    score columns are also written to {year}_{batch}_with_All_Crops_Corrected.csv
+    in the working directory.
+
+    Runs in a worker process; returns (year, fields, fields scored, version).
+    """
+    table, version = load_conversion_table(table_path)
+    frames = []
+    for path in paths:
+        batch, scored = score_file(path, table, all_columns=write_csv)
+        if write_csv:
+            csv_path = f"{os.path.splitext(os.path.basename(path))[0]}_with_All_Crops_Corrected.csv"
+            scored.to_csv(csv_path, index=False)
+            print(f"File saved at: {csv_path}")
+        columns = [column for column in ID_COLUMNS if column in scored] + RESULT_COLUMNS
+        scored = scored[columns].astype({column: "string" for column in ID_COLUMNS if column in scored})
+        scored.insert(0, "batch", batch)
+        frames.append(scored)
+    scored = pd.concat(frames, ignore_index=True)
+    scored["conversion_version"] = version
+    distributions = score_distributions(scored)
+    distributions["conversion_version"] = version
+
+    write_partitioned(scored, os.path.join(output_dir, "field_scores"), year)
+    write_partitioned(distributions, os.path.join(output_dir, "project_distributions"), year)
+    return year, len(scored), int(scored["ci_score"].notna().sum()), version
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score carbon intensity for verified flat files")
+    parser.add_argument("inputs", nargs="*",
+                        help=f"Flat files named <year>_<batch>.csv (default: {file_path}, also written as CSV)")
+    parser.add_argument("--conversion-table", default=CONVERSION_TABLE_PATH,
+                        help="Versioned JSON table of kg per yield unit")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR, help="Root of the partitioned Parquet datasets")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Years scored in parallel")
+    parser.add_argument("--csv", action="store_true",
+                        help="Also write each file's rows with their scores to <year>_<batch>_with_All_Crops_Corrected.csv")
+    args = parser.parse_args()
+
+    # Without inputs, score the default file and write its CSV as before
+    inputs = args.inputs or [file_path]
+    write_csv = args.csv or not args.inputs
+
+    by_year = {}
+    for path in inputs:
+        by_year.setdefault(file_year(path)[0], []).append(path)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=min(args.workers, len(by_year))) as executor:
+        futures = [
+            executor.submit(score_year, year, paths, args.conversion_table, args.output_dir, write_csv)
+            for year, paths in sorted(by_year.items())
+        ]
+        failed = []
+        for year, future in zip(sorted(by_year), futures):
+            try:
+                year, fields, scored, version = future.result()
+            except Exception as e:
+                print(f"Error scoring {year}: {e}")
+                failed.append(year)
+                continue
+            print(f"{year}: scored {scored} of {fields} fields (conversion table v{version})")
+    print(f"Field scores and project distributions written to {args.output_dir}")
+    if failed:
+        sys.exit(1)
+
 
-# Extract numeric yield value and the unit (bushels or pounds per acre)
-def extract_yield_and_unit(crop_yield_str):
-    try:
-        # Extract the yield number
-        yield_value = float(re.search(r'Yield-\s*([\d.]+)', crop_yield_str).group(1))
-        
-        # Extract the unit (bushels or pounds)
-        unit_match = re.search(r'(bushels|pounds)/acre', crop_yield_str)
-        if unit_match:
-            unit = unit_match.group(1)
-        else:
-            unit = None
-            
-        return yield_value, unit
-    except (AttributeError, ValueError):
-        return None, None
-
-# Extract yield and unit from the crop_yield column
-df['crop_yield_extracted'] = df['crop_yield'].apply(lambda x: extract_yield_and_unit(str(x)))
-
-# Calculate crop weight based on extracted yield and unit
-def calculate_crop_weight(row, crop_yield_data):
-    crop_name = extract_crop_name(row["crop_yield"])
-    yield_value, unit = row["crop_yield_extracted"]
-    
-    if crop_name in crop_yield_data and yield_value is not None and unit == crop_yield_data[crop_name]["unit"]:
-        # Get the kg per unit based on the crop
-        kg_per_unit = crop_yield_data[crop_name]["kg_per_unit"]
-        total_crop_weight = yield_value * kg_per_unit  # Yield * kg per unit
-        return total_crop_weight
-    return None
-
-# Calculate crop_weight
-df["crop_weight"] = df.apply(calculate_crop_weight, axis=1, crop_yield_data=crop_yields)
-
-# Define function to calculate total emissions and ci_score
-def calculate_ci_score(row):
-    # Convert relevant emissions columns to kg (multiply by 0.001 for tonne-to-kg conversion)
-    total_emissions = (
-        (row["n2o_direct"] * 0.001) +
-        (row["n2o_indirect_adjusted"] * 0.001) +
-        (row["methane_adjusted"] * 0.001) +
-        row["field_practice_emissions"]
-    )
-    
-    if row["crop_weight"] and row["crop_weight"] != 0:
-        return total_emissions / row["crop_weight"]
-    return None
-
-# Calculate ci_score based on emissions and crop weight
-df["ci_score"] = df.apply(calculate_ci_score, axis=1)
-
-# Save the updated CSV file with the new columns
-output_file_path = "2023_Verified_with_All_Crops_Corrected.csv"
-df.to_csv(output_file_path, index=False)
-
-print(f"File saved at: {output_file_path}")
+if __name__ == "__main__":
+    main()
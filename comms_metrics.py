@@ -4,6 +4,7 @@ import matplotlib.pyplot as plt
 from openpyxl import Workbook
 from openpyxl.drawing.image import Image
 from openpyxl.utils.dataframe import dataframe_to_rows
+from verified_data import load_verified
 
 # Load data
 # verified_data = pd.read_csv('2023_Verified.csv')
@@ -21,23 +22,24 @@ files = [
     '2021_Verified.csv'
 ]
 
-# Combine the data from all files
-combined_data = pd.concat([pd.read_csv(f) for f in files])
+# Combine the data from all files, loading only the columns used below
+combined_data = load_verified(files, columns=['field_state', 'Commodity', 'Practice Change', 'Acres'])
 
 # Filter and aggregate the data
 filtered_data = combined_data[
     combined_data['Commodity'].str.contains('Corn|Cotton|Wheat|Soybeans', case=False, na=False)
-]
+].copy()
+filtered_data['Commodity'] = filtered_data['Commodity'].astype(str)
 
 # Replace multiple crops including wheat into "Wheat"
 filtered_data.loc[filtered_data['Commodity'].str.contains('Wheat', case=False, na=False), 'Commodity'] = 'Wheat'
 
 # Sum acres by state and commodity
-state_commodity_acres = filtered_data.groupby(['field_state', 'Commodity'])['Acres'].sum().unstack(fill_value=0)
+state_commodity_acres = filtered_data.groupby(['field_state', 'Commodity'], observed=True)['Acres'].sum().unstack(fill_value=0)
 
 # Filter for practice change containing "grazing"
 grazing_data = combined_data[combined_data['Practice Change'].str.contains('grazing', case=False, na=False)]
-state_grazing_acres = grazing_data.groupby('field_state')['Acres'].sum()
+state_grazing_acres = grazing_data.groupby('field_state', observed=True)['Acres'].sum()
 
 # Ensure there are no NaN values in the aggregated data
 state_commodity_acres = state_commodity_acres.fillna(0)
@@ -1,6 +1,9 @@
 import os
-import geopandas as gpd
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
+from geojson_io import read_geodataframe, unique_property_values
 
 # List of project folders
 project_folders = [
@@ -18,37 +21,76 @@ project_folders = [
     "TNC Nebraska (TNCNE)"
 ]
 
-def count_unique_field_ids_in_project_folders():
+# Cached counts keyed by file path, reused while mtime and size are unchanged
+CACHE_FILE = 'field_counts_cache.json'
+
+def count_field_ids(file_path, engine='stream'):
+    """Count unique fieldIds in one GeoJSON file without parsing geometry"""
+    if engine == 'pyogrio':
+        df = read_geodataframe(file_path, columns=['fieldId'], read_geometry=False)
+        return int(df['fieldId'].nunique())
+    return len(unique_property_values(file_path, 'fieldId'))
+
+def load_cache(cache_path):
+    try:
+        with open(cache_path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def count_unique_field_ids_in_project_folders(engine='stream', max_workers=None, cache_path=CACHE_FILE):
     results = []
     total_monitoring_fields = 0
     total_modeling_fields = 0
 
     # Assume the current working directory is the base directory
     base_directory = os.getcwd()
+    cache_path = os.path.join(base_directory, cache_path)
+    cache = load_cache(cache_path)
 
+    # Collect every GeoJSON file, reusing cached counts for unchanged files
+    files = []
+    counts = {}
     for project in project_folders:
         project_dir = os.path.join(base_directory, project)
         if os.path.isdir(project_dir):
-            for filename in os.listdir(project_dir):
+            for filename in sorted(os.listdir(project_dir)):
                 if filename.endswith(".geojson"):
                     file_path = os.path.join(project_dir, filename)
-                    geo_data = gpd.read_file(file_path)
+                    stat = os.stat(file_path)
+                    files.append((project, filename, file_path, stat.st_mtime, stat.st_size))
+                    cached = cache.get(file_path)
+                    if cached and cached['mtime'] == stat.st_mtime and cached['size'] == stat.st_size:
+                        counts[file_path] = cached['count']
+
+    # Count changed files in parallel
+    pending = [file_path for _, _, file_path, _, _ in files if file_path not in counts]
+    print(f"Counting {len(pending)} changed files ({len(files) - len(pending)} cached)")
+    if pending:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for file_path, count in zip(pending, executor.map(count_field_ids, pending, [engine] * len(pending))):
+                counts[file_path] = count
+
+    new_cache = {}
+    for project, filename, file_path, mtime, size in files:
+        unique_field_count = counts[file_path]
+        new_cache[file_path] = {'mtime': mtime, 'size': size, 'count': unique_field_count}
+        results.append({
+            'Project': project,
+            'File': filename,
+            'Unique Field Count': unique_field_count
+        })
 
-                    # Count unique field IDs
-                    unique_field_count = geo_data['fieldId'].nunique()
-                    results.append({
-                        'Project': project,
-                        'File': filename,
-                        'Unique Field Count': unique_field_count
-                    })
+        # Determine if the file is for monitoring or modeling
+        if "monitoring" in filename.lower():
+            total_monitoring_fields += unique_field_count
+        elif "modeled" in filename.lower():
+            total_modeling_fields += unique_field_count
 
-                    # Determine if the file is for monitoring or modeling
-                    if "monitoring" in filename.lower():
-                        total_monitoring_fields += unique_field_count
-                    elif "modeled" in filename.lower():
-                        total_modeling_fields += unique_field_count
+        print(f"Project: {project}, File: {filename}, Unique Fields: {unique_field_count}")
 
-                    print(f"Project: {project}, File: {filename}, Unique Fields: {unique_field_count}")
+    with open(cache_path, 'w') as f:
+        json.dump(new_cache, f)
 
     # Export results to CSV
     results_df = pd.DataFrame(results)
@@ -58,5 +100,10 @@ def count_unique_field_ids_in_project_folders():
     print(f"Total Monitoring Fields: {total_monitoring_fields}")
     print(f"Total Modeling Fields: {total_modeling_fields}")
 
-# Run the function
-count_unique_field_ids_in_project_folders()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Count unique fieldIds in each project folder's GeoJSON files")
+    parser.add_argument("--engine", choices=["stream", "pyogrio"], default="stream",
+                        help="Read fieldIds with a streaming JSON scan or a pyogrio column projection")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+    count_unique_field_ids_in_project_folders(args.engine, args.workers)
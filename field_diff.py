@@ -0,0 +1,185 @@
+"""
+Year-over-year field diffs across any number of GeoJSON boundary files.
+
+Generalizes unique-fields.py: for each consecutive pair of files (e.g.
+CIF-2023 -> CIF-2024 -> CIF-2025) fields are partitioned into new,
+dropped, retained and boundary-changed sets. The earlier file is reduced
+to a fieldId -> geometry-hash index, so boundary edits are detected by
+comparing hashes rather than geometries, and the later file is streamed
+once straight into its partition files. Pairs run on a process pool.
+
+Usage:
+    python field_diff.py CIF-2023.geojson CIF-2024.geojson CIF-2025.geojson
+    python field_diff.py --series A-2024.geojson,A-2025.geojson --series B-2024.geojson,B-2025.geojson
+"""
+import os
+import csv
+import json
+import hashlib
+import argparse
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor
+from geojson_io import iter_features, FeatureCollectionWriter
+
+PARTITIONS = ["new", "dropped", "retained", "changed"]
+
+
+def round_coordinates(coordinates, precision):
+    """Round a nested coordinate array to floats so 2 and 2.0000000001 hash alike."""
+    if isinstance(coordinates, (int, float)):
+        return round(float(coordinates), precision)
+    return [round_coordinates(c, precision) for c in coordinates]
+
+
+def geometry_hash(geometry, precision=None):
+    """Stable digest of a GeoJSON geometry's type and coordinates."""
+    if not geometry:
+        return None
+    coordinates = geometry.get("coordinates")
+    if precision is not None and coordinates is not None:
+        coordinates = round_coordinates(coordinates, precision)
+    payload = json.dumps([geometry.get("type"), coordinates], separators=(",", ":"))
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+def build_index(path, id_key="fieldId", precision=None):
+    """Stream a file into a fieldId -> geometry hash index."""
+    index = {}
+    for feature in iter_features(path):
+        field_id = (feature.get("properties") or {}).get(id_key)
+        if field_id is not None:
+            index[field_id] = geometry_hash(feature.get("geometry"), precision)
+    return index
+
+
+def file_label(path):
+    """File name without its GeoJSON extension(s), e.g. CIF-2024."""
+    name = os.path.basename(path)
+    for suffix in (".gz", ".geojson", ".json"):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+    return name
+
+
+def pair_name(before_path, after_path):
+    """
+    Directory name for a compared pair, e.g. CIF-2023_to_CIF-2024.
+
+    Files with the same name are told apart by their parent directory
+    (2023-fields_to_2024-fields).
+    """
+    before, after = file_label(before_path), file_label(after_path)
+    if before == after:
+        before = f"{os.path.basename(os.path.dirname(os.path.abspath(before_path)))}-{before}"
+        after = f"{os.path.basename(os.path.dirname(os.path.abspath(after_path)))}-{after}"
+    return f"{before}_to_{after}"
+
+
+def diff_pair(before_path, after_path, output_dir, id_key="fieldId", precision=None, name=None):
+    """
+    Partition fields between two files and write each partition as GeoJSON.
+
+    new, retained and changed features come from the later file in a single
+    streaming pass; dropped features are copied from the earlier file.
+    Partitions go to output_dir/name (pair_name by default).
+
+    Returns a summary dict with the count of each partition.
+    """
+    pair_dir = os.path.join(output_dir, name or pair_name(before_path, after_path))
+    os.makedirs(pair_dir, exist_ok=True)
+    before = build_index(before_path, id_key, precision)
+
+    seen = set()
+    with ExitStack() as stack:
+        writers = {
+            name: stack.enter_context(FeatureCollectionWriter(os.path.join(pair_dir, f"{name}.geojson")))
+            for name in PARTITIONS
+        }
+        for feature in iter_features(after_path):
+            field_id = (feature.get("properties") or {}).get(id_key)
+            if field_id is None:
+                continue
+            seen.add(field_id)
+            if field_id not in before:
+                writers["new"].write(feature)
+            elif before[field_id] != geometry_hash(feature.get("geometry"), precision):
+                writers["changed"].write(feature)
+            else:
+                writers["retained"].write(feature)
+
+        dropped = before.keys() - seen
+        if dropped:
+            for feature in iter_features(before_path):
+                if (feature.get("properties") or {}).get(id_key) in dropped:
+                    writers["dropped"].write(feature)
+
+    return {
+        "before": file_label(before_path),
+        "after": file_label(after_path),
+        "before_fields": len(before),
+        "after_fields": len(seen),
+        **{name: writer.count for name, writer in writers.items()},
+        "output_dir": pair_dir
+    }
+
+
+def diff_series(series, output_dir, id_key="fieldId", precision=None, max_workers=None):
+    """
+    Diff every consecutive pair in each series of files on a process pool.
+
+    Args:
+        series (list): Lists of GeoJSON paths, each ordered oldest to newest
+        output_dir (str): Root directory for the per-pair partition folders
+
+    Returns:
+        list: One summary dict per compared pair
+    """
+    pairs = [(s, files[i], files[i + 1]) for s, files in enumerate(series) for i in range(len(files) - 1)]
+    if not pairs:
+        return []
+
+    # Pairs that would share a directory are prefixed with their series index,
+    # so no two workers write the same partition files
+    names = [pair_name(before, after) for _, before, after in pairs]
+    names = [f"series{s + 1}_{name}" if names.count(name) > 1 else name
+             for (s, _, _), name in zip(pairs, names)]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(diff_pair, before, after, output_dir, id_key, precision, name)
+            for (_, before, after), name in zip(pairs, names)
+        ]
+        return [future.result() for future in futures]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff field boundaries across years by fieldId and geometry hash")
+    parser.add_argument("files", nargs="*", help="GeoJSON files for one series, oldest first")
+    parser.add_argument("--series", action="append", default=[],
+                        help="Comma-separated GeoJSON files for another series, oldest first (repeatable)")
+    parser.add_argument("--output-dir", default="field_diffs", help="Directory for partition files and summary.csv")
+    parser.add_argument("--id-key", default="fieldId", help="Feature property identifying a field")
+    parser.add_argument("--precision", type=int,
+                        help="Round coordinates to this many decimals before hashing")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    series = [args.files] if args.files else []
+    series += [s.split(",") for s in args.series]
+    summaries = diff_series(series, args.output_dir, args.id_key, args.precision, args.workers)
+
+    for summary in summaries:
+        print(f"{summary['before']} -> {summary['after']}: "
+              f"{summary['new']} new, {summary['dropped']} dropped, "
+              f"{summary['retained']} retained, {summary['changed']} boundary-changed")
+
+    if summaries:
+        summary_path = os.path.join(args.output_dir, "summary.csv")
+        with open(summary_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(summaries[0].keys()))
+            writer.writeheader()
+            writer.writerows(summaries)
+        print(f"Summary saved to {summary_path}")
+
+
+if __name__ == "__main__":
+    main()
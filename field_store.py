@@ -0,0 +1,297 @@
+"""
+Local field-boundary store shared by the exporters.
+
+Field boundaries, acres, producer and practice changes are kept in one
+SQLite file keyed by (field ID, season year), with boundaries stored once
+as normalized MultiPolygon WKB. FieldStore.sync first pulls a light index
+of the project/year (field IDs, updatedAt and practice changes, no
+boundaries) and then fetches in full only the fields that are new to the
+project, edited or whose practice changes differ; fields no longer
+enrolled are dropped from the project. Exports become local reads
+instead of full API pulls. Records come back in the same shape as the
+Hasura farmField rows (or as GeoJSON features), so the PLET and Millpont
+exporters use them unchanged.
+
+Usage:
+    python field_store.py --projects CIFCSC SNW --years 2023 2024
+"""
+import json
+import sqlite3
+import argparse
+import threading
+from contextlib import contextmanager
+from itertools import islice
+from datetime import datetime, timezone
+
+STORE_PATH = "field_store.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fields (
+    field_id TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    name TEXT,
+    acres REAL,
+    producer_id TEXT,
+    producer_name TEXT,
+    producer_email TEXT,
+    practice_changes TEXT,
+    boundary BLOB,
+    updated_at TEXT,
+    PRIMARY KEY (field_id, year)
+);
+CREATE TABLE IF NOT EXISTS field_projects (
+    field_id TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    project TEXT NOT NULL,
+    PRIMARY KEY (project, year, field_id)
+);
+CREATE TABLE IF NOT EXISTS syncs (
+    project TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    synced_at TEXT,
+    PRIMARY KEY (project, year)
+);
+"""
+
+# Enrollment and change markers only; enrollment and practice changes live
+# in join tables and do not touch farmField.updatedAt
+FIELD_INDEX_QUERY = """
+query FieldIndex($where: farmField_bool_exp!, $limit: Int!, $offset: Int!) {
+  farmField(where: $where, order_by: {id: asc}, limit: $limit, offset: $offset) {
+    id
+    updatedAt
+    many_field_has_many_practice_changes {
+      practice_change {
+        abbreviation
+        name
+        description
+      }
+      year
+    }
+  }
+}
+"""
+
+FIELD_DELTA_QUERY = """
+query FieldDelta($where: farmField_bool_exp!, $limit: Int!, $offset: Int!) {
+  farmField(where: $where, order_by: {id: asc}, limit: $limit, offset: $offset) {
+    id
+    name
+    acres
+    boundary
+    boundaryArray
+    updatedAt
+    many_field_has_many_practice_changes {
+      practice_change {
+        abbreviation
+        name
+        description
+      }
+      year
+    }
+    app_user {
+      id
+      displayName
+      email
+    }
+  }
+}
+"""
+
+
+def field_where(abbr, year):
+    """farmField filter for fields enrolled in a project and year."""
+    where = {
+        "many_field_has_many_practice_changes": {
+            "practice_change": {"abbreviation": {"_nin": ["PE", "UE"]}},
+            "year": {"_eq": year}
+        },
+        "seasons": {"year": {"_eq": year}},
+        "farmer_project_fields": {"farmer_project": {"project": {"abbreviation": {"_ilike": abbr}}}}
+    }
+    return where
+
+
+def practice_changes_key(field):
+    """Practice changes of a farmField row as stored (JSON), for change detection."""
+    return json.dumps(field.get("many_field_has_many_practice_changes") or [], sort_keys=True)
+
+
+def field_rows(page, year):
+    """fields table rows for a page of farmField records, boundaries as normalized WKB."""
+    import shapely
+    from geometry_normalize import normalize_geometries
+
+    geometries, _ = normalize_geometries([field.get("boundaryArray") or field.get("boundary") for field in page])
+    boundaries = shapely.to_wkb(shapely.from_geojson([json.dumps(g) if g else None for g in geometries]))
+    rows = []
+    for field, boundary in zip(page, boundaries):
+        user = field.get("app_user") or {}
+        rows.append((
+            str(field["id"]), year, field.get("name"), field.get("acres"),
+            user.get("id"), user.get("displayName"), user.get("email"),
+            practice_changes_key(field), boundary, field.get("updatedAt")
+        ))
+    return rows
+
+
+class FieldStore:
+    """
+    SQLite-backed store of field boundaries keyed by field ID and year.
+
+    Each call opens (and closes) its own connection, so one store can be
+    shared by worker threads; writes are serialized with a lock.
+    """
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self._write_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """Connection that commits (or rolls back) and is closed on exit."""
+        conn = sqlite3.connect(self.path, timeout=60)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def sync(self, abbr, year, client=None, page_size=500, full_refresh=False):
+        """
+        Bring the fields of a project/year in the store up to date with Hasura.
+
+        Fields new to the project/year, edited since they were stored or
+        whose practice changes differ are fetched in full (every field with
+        full_refresh); fields no longer enrolled are dropped from the
+        project/year. API calls run outside the write lock, so syncs of
+        different project-years overlap.
+
+        Returns the number of fields written.
+        """
+        from hasura_client import get_client
+
+        client = client or get_client()
+        where = field_where(abbr, year)
+
+        with self._connect() as conn:
+            stored = {
+                field_id: (updated_at, practice_changes)
+                for field_id, updated_at, practice_changes in conn.execute(
+                    "SELECT field_id, updated_at, practice_changes FROM fields WHERE year = ?", (year,))
+            }
+
+        enrolled = []
+        stale = []
+        offset = 0
+        while True:
+            page = client.query(FIELD_INDEX_QUERY, {"where": where, "limit": page_size, "offset": offset})["farmField"]
+            for field in page:
+                field_id = str(field["id"])
+                enrolled.append(field_id)
+                updated_at, practice_changes = stored.get(field_id, (None, None))
+                if (full_refresh or field_id not in stored or practice_changes != practice_changes_key(field)
+                        or field.get("updatedAt") != updated_at):
+                    stale.append(field_id)
+            if len(page) < page_size:
+                break
+            offset += page_size
+
+        written = 0
+        for start in range(0, len(stale), page_size):
+            ids = stale[start:start + page_size]
+            page = client.query(FIELD_DELTA_QUERY, {"where": {"id": {"_in": ids}}, "limit": len(ids), "offset": 0})
+            rows = field_rows(page["farmField"], year)
+            with self._write_lock, self._connect() as conn:
+                conn.executemany("INSERT OR REPLACE INTO fields VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            written += len(rows)
+
+        with self._write_lock, self._connect() as conn:
+            conn.execute("DELETE FROM field_projects WHERE project = ? AND year = ?", (abbr, year))
+            conn.executemany("INSERT OR IGNORE INTO field_projects VALUES (?, ?, ?)",
+                             [(field_id, year, abbr) for field_id in enrolled])
+            conn.execute("INSERT OR REPLACE INTO syncs (project, year, synced_at) VALUES (?, ?, ?)",
+                         (abbr, year, datetime.now(timezone.utc).isoformat()))
+        return written
+
+    def records(self, abbr, year):
+        """
+        Yield stored fields of a project/year shaped like Hasura farmField rows.
+
+        boundary holds the normalized GeoJSON MultiPolygon (or None).
+        """
+        import shapely
+
+        with self._connect() as conn:
+            cursor = conn.execute(
+                """
+                SELECT f.field_id, f.name, f.acres, f.producer_id, f.producer_name, f.producer_email,
+                       f.practice_changes, f.boundary
+                FROM field_projects p JOIN fields f ON f.field_id = p.field_id AND f.year = p.year
+                WHERE p.project = ? AND p.year = ?
+                ORDER BY f.field_id
+                """,
+                (abbr, year)
+            )
+            for field_id, name, acres, producer_id, producer_name, producer_email, practice_changes, boundary in cursor:
+                yield {
+                    "id": field_id,
+                    "name": name,
+                    "acres": acres,
+                    "boundary": json.loads(shapely.to_geojson(shapely.from_wkb(boundary))) if boundary else None,
+                    "boundaryArray": None,
+                    "many_field_has_many_practice_changes": json.loads(practice_changes),
+                    "app_user": {"id": producer_id, "displayName": producer_name, "email": producer_email}
+                    if producer_id or producer_email else None
+                }
+
+    def record_pages(self, abbr, year, page_size=500):
+        """Yield stored records in lists of page_size, like fetch_field_pages."""
+        records = self.records(abbr, year)
+        while True:
+            page = list(islice(records, page_size))
+            if not page:
+                return
+            yield page
+
+    def iter_features(self, abbr, year):
+        """Yield stored fields as GeoJSON features (the fetch_field_details export layout)."""
+        for field in self.records(abbr, year):
+            user = field["app_user"] or {}
+            yield {
+                "type": "Feature",
+                "properties": {
+                    "id": field["id"],
+                    "name": field["name"],
+                    "acres": field["acres"],
+                    "email": user.get("email"),
+                    "displayName": user.get("displayName"),
+                    "practice_changes": [
+                        pc["practice_change"] for pc in field["many_field_has_many_practice_changes"]
+                        if pc.get("practice_change")
+                    ]
+                },
+                "geometry": field["boundary"]
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync MRV field boundaries into the local field store")
+    parser.add_argument("--store", default=STORE_PATH, help="SQLite store path")
+    parser.add_argument("--projects", nargs="+", required=True, help="Project abbreviations")
+    parser.add_argument("--years", nargs="+", type=int, required=True, help="Season years")
+    parser.add_argument("--page-size", type=int, default=500, help="Fields per API page")
+    parser.add_argument("--full-refresh", action="store_true", help="Re-pull every enrolled field")
+    args = parser.parse_args()
+
+    store = FieldStore(args.store)
+    for abbr in args.projects:
+        for year in args.years:
+            written = store.sync(abbr, year, page_size=args.page_size, full_refresh=args.full_refresh)
+            print(f"Synced {written} changed fields for {abbr} {year} into {args.store}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Shared GeoJSON I/O for the large boundary files used across the repo.
+
+Features and properties are streamed one at a time with ijson so memory
+stays bounded on statewide FeatureCollections; property-only reads skip
+building geometry objects entirely. GeoDataFrames are read through pyogrio
+(with Arrow when available) and can skip geometry or select columns.
+Files ending in .gz are read and written transparently. Without ijson
+installed the streaming helpers fall back to json.load; compact output is
+serialized with orjson when it is installed.
+"""
+import gzip
+import os
+import json
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def open_geojson(path, mode="rb"):
+    """Open a GeoJSON file, decompressing .gz files on the fly."""
+    if str(path).endswith(".gz"):
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+def _iter_prefix(path, prefix):
+    """Yield the objects at an ijson prefix, or the equivalent json.load items."""
+    with open_geojson(path) as f:
+        if ijson is not None:
+            yield from ijson.items(f, prefix, use_float=True)
+            return
+        features = json.load(f).get("features", [])
+    for feature in features:
+        yield feature if prefix == "features.item" else feature.get("properties") or {}
+
+
+def iter_features(path):
+    """Stream the features of a FeatureCollection one at a time."""
+    yield from _iter_prefix(path, "features.item")
+
+
+def iter_properties(path, keys=None):
+    """
+    Stream only the properties of each feature, never building geometries.
+
+    Args:
+        path (str): GeoJSON file
+        keys (list): Optional property names to keep; missing keys are None
+    """
+    for properties in _iter_prefix(path, "features.item.properties"):
+        properties = properties or {}
+        if keys is None:
+            yield properties
+        else:
+            yield {key: properties.get(key) for key in keys}
+
+
+def unique_property_values(path, key):
+    """Set of distinct non-null values of one property."""
+    return {
+        properties[key]
+        for properties in iter_properties(path, [key])
+        if properties[key] is not None
+    }
+
+
+def read_geodataframe(path, columns=None, read_geometry=True):
+    """
+    Read a GeoJSON file into a (Geo)DataFrame through pyogrio.
+
+    With read_geometry=False a plain DataFrame of the requested columns is
+    returned without parsing any geometry. Falls back to geopandas.read_file
+    when pyogrio is not installed.
+    """
+    try:
+        import pyogrio
+    except ImportError:
+        import geopandas as gpd
+        gdf = gpd.read_file(path)
+        if columns is not None:
+            gdf = gdf[list(columns) + (["geometry"] if read_geometry else [])]
+        return gdf if read_geometry else gdf.drop(columns="geometry", errors="ignore")
+
+    try:
+        return pyogrio.read_dataframe(path, columns=columns, read_geometry=read_geometry, use_arrow=True)
+    except Exception:
+        # use_arrow needs pyarrow and a GDAL built with Arrow support
+        return pyogrio.read_dataframe(path, columns=columns, read_geometry=read_geometry)
+
+
+class FeatureCollectionWriter:
+    """
+    Incrementally write features into a FeatureCollection file.
+
+    Use as a context manager and call write() per feature, or
+    write_many() per batch; nothing is buffered beyond the current batch.
+    Extra keyword arguments (name, crs, ...) become top-level members.
+    Output is compact (via orjson when available) unless an indent is
+    given; paths ending in .gz are gzipped. Features go to a .partial file
+    that replaces path only on a clean exit, so a failed run never leaves
+    a truncated collection behind.
+    """
+
+    def __init__(self, path, indent=None, **members):
+        self.path = path
+        self.indent = indent
+        self.members = members
+        self.separators = (",", ":") if indent is None else None
+        self.count = 0
+        self._file = None
+        # Keep the .gz suffix so open_geojson compresses the partial file too
+        self._partial_path = f"{path}.partial.gz" if str(path).endswith(".gz") else f"{path}.partial"
+
+    def _dumps(self, value):
+        if self.indent is None and orjson is not None:
+            try:
+                return orjson.dumps(value).decode()
+            except TypeError:
+                pass  # e.g. numpy scalars or Decimal; the json module copes
+        return json.dumps(value, indent=self.indent, separators=self.separators)
+
+    def __enter__(self):
+        self._file = open_geojson(self._partial_path, "wt")
+        self._file.write('{"type":"FeatureCollection"')
+        for key, value in self.members.items():
+            self._file.write(f",{json.dumps(key)}:{self._dumps(value)}")
+        self._file.write(',"features":[')
+        return self
+
+    def write(self, feature):
+        if self.count:
+            self._file.write(",")
+        if self.indent is not None:
+            self._file.write("\n")
+        self._file.write(self._dumps(feature))
+        self.count += 1
+
+    def write_many(self, features):
+        """Write a batch of features with a single file write."""
+        features = list(features)
+        if not features:
+            return
+        separator = ",\n" if self.indent is not None else ","
+        prefix = "," if self.count else ""
+        if self.indent is not None:
+            prefix += "\n"
+        self._file.write(prefix + separator.join(self._dumps(feature) for feature in features))
+        self.count += len(features)
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self._file.close()
+            os.remove(self._partial_path)
+            return False
+        self._file.write("]}\n")
+        self._file.close()
+        os.replace(self._partial_path, self.path)
+        return False
+
+
+def write_feature_collection(path, features, indent=None, **members):
+    """
+    Stream features into a FeatureCollection file without holding them all.
+
+    Returns the number of features written; see FeatureCollectionWriter.
+    """
+    with FeatureCollectionWriter(path, indent=indent, **members) as writer:
+        for feature in features:
+            writer.write(feature)
+    return writer.count
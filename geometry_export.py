@@ -0,0 +1,175 @@
+"""
+Export-time compaction of field boundaries for PLET and Millpont uploads.
+
+Boundaries come out of the MRV API with 15+ decimal coordinates and every
+digitized vertex. compact_geometries optionally simplifies them with a
+topology-preserving tolerance, snaps coordinates to a ~6 decimal grid
+(about 0.1 m), and checks the area before and after so no field drifts
+more than max_drift. A geometry that would drift further (or collapse) is
+only quantized, or left untouched if even that drifts. When the enrolled
+acres are known the exported area is also compared to them.
+
+Areas come from the vectorized equal-area engine in acreage.py.
+"""
+import json
+import numpy as np
+import shapely
+from acreage import equal_area_acres
+
+DEFAULT_PRECISION = 6
+DEFAULT_MAX_DRIFT = 0.01
+DEFAULT_ACRES_TOLERANCE = 0.05
+
+
+def quantize_coordinates(coordinates, precision):
+    """Round a nested coordinate array so the JSON carries no float noise."""
+    if isinstance(coordinates, (int, float)):
+        return round(float(coordinates), precision)
+    return [quantize_coordinates(c, precision) for c in coordinates]
+
+
+def geometry_size(geometry):
+    """Bytes of a geometry as compact JSON."""
+    return len(json.dumps(geometry, separators=(",", ":"))) if geometry else 0
+
+
+def _within_drift(before, after, max_drift):
+    """Elementwise check that area changed by at most max_drift (relative)."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drift = np.abs(after - before) / before
+    return np.nan_to_num(drift, nan=np.inf) <= max_drift, drift
+
+
+def _match_types(shapes, originals):
+    """
+    Give each processed shape its original Polygon/MultiPolygon type.
+
+    simplify and set_precision unwrap single-part MultiPolygons and may split
+    Polygons; returns (shapes, mask of shapes that could be matched).
+    """
+    shapes = shapely.orient_polygons(shapes, exterior_cw=False)  # set_precision reverses rings
+    shape_types = shapely.get_type_id(shapes)
+    original_types = shapely.get_type_id(originals)
+    wrap = (original_types == 6) & (shape_types == 3)
+    shapes[wrap] = [shapely.MultiPolygon([shape]) for shape in shapes[wrap]]
+    unwrap = (original_types == 3) & (shape_types == 6) & (shapely.get_num_geometries(shapes) == 1)
+    shapes[unwrap] = shapely.get_geometry(shapes[unwrap], 0)
+    return shapes, (shapely.get_type_id(shapes) == original_types) & ~shapely.is_empty(shapes)
+
+
+def compact_geometries(geometries, acres=None, tolerance=None, precision=DEFAULT_PRECISION,
+                       max_drift=DEFAULT_MAX_DRIFT, acres_tolerance=DEFAULT_ACRES_TOLERANCE):
+    """
+    Simplify and quantize GeoJSON geometries for export.
+
+    Args:
+        geometries (list): GeoJSON geometry dicts (None entries pass through)
+        acres (list): Optional enrolled acres per geometry for validation
+        tolerance (float): Simplification tolerance in degrees; None skips simplification
+        precision (int): Decimal places to keep; None keeps full precision
+        max_drift (float): Largest allowed relative change in area
+        acres_tolerance (float): Relative difference from acres that is flagged
+
+    Returns:
+        tuple: (list of GeoJSON geometry dicts, list of per-geometry report dicts)
+    """
+    present = [i for i, geometry in enumerate(geometries) if geometry]
+    output = list(geometries)
+    report = [{"index": i, "bytes_before": geometry_size(g), "bytes_after": geometry_size(g), "status": "empty"}
+              for i, g in enumerate(geometries)]
+    if not present:
+        return output, report
+
+    originals = shapely.from_geojson([json.dumps(geometries[i]) for i in present])
+    candidates = originals
+    if tolerance:
+        candidates = shapely.simplify(candidates, tolerance, preserve_topology=True)
+    quantized = originals
+    if precision is not None:
+        grid_size = 10.0 ** -precision
+        candidates = shapely.set_precision(candidates, grid_size)
+        quantized = shapely.set_precision(originals, grid_size)
+
+    candidates, matched = _match_types(candidates, originals)
+    quantized, quantized_matched = _match_types(quantized, originals)
+
+    original_acres = equal_area_acres(originals)
+    ok, _ = _within_drift(original_acres, equal_area_acres(candidates), max_drift)
+    ok &= matched
+
+    # Fall back to quantization only, then to the original geometry
+    fallback = ~ok
+    status = np.where(ok, "compacted", "quantized")
+    if fallback.any():
+        quantized_ok, _ = _within_drift(original_acres[fallback], equal_area_acres(quantized[fallback]), max_drift)
+        quantized_ok &= quantized_matched[fallback]
+        candidates[fallback] = np.where(quantized_ok, quantized[fallback], originals[fallback])
+        status[fallback] = np.where(quantized_ok, "quantized", "unchanged")
+
+    final_acres = equal_area_acres(candidates)
+    _, drift = _within_drift(original_acres, final_acres, max_drift)
+    vertices_before = shapely.get_num_coordinates(originals)
+    vertices_after = shapely.get_num_coordinates(candidates)
+
+    for position, (i, text) in enumerate(zip(present, shapely.to_geojson(candidates))):
+        if status[position] == "unchanged":
+            geometry = geometries[i]
+        else:
+            geometry = json.loads(text)
+            if precision is not None:
+                geometry["coordinates"] = quantize_coordinates(geometry["coordinates"], precision)
+        output[i] = geometry
+        entry = report[i]
+        entry.update({
+            "status": str(status[position]),
+            "vertices_before": int(vertices_before[position]),
+            "vertices_after": int(vertices_after[position]),
+            "area_drift": float(drift[position]),
+            "computed_acres": float(final_acres[position]),
+            "bytes_after": geometry_size(geometry)
+        })
+        if acres is not None and acres[i]:
+            acres_drift = (final_acres[position] - acres[i]) / acres[i]
+            entry["acres_drift"] = float(acres_drift)
+            entry["acres_mismatch"] = bool(abs(acres_drift) > acres_tolerance)
+    return output, report
+
+
+def compact_features(features, acres_key=None, **options):
+    """
+    Compact the geometries of a list of GeoJSON features.
+
+    acres_key names the property holding enrolled acres for validation.
+    Returns (new features, report); input features are not modified.
+    """
+    acres = None
+    if acres_key:
+        acres = [(feature.get("properties") or {}).get(acres_key) for feature in features]
+    geometries, report = compact_geometries([feature.get("geometry") for feature in features], acres, **options)
+    return [{**feature, "geometry": geometry} for feature, geometry in zip(features, geometries)], report
+
+
+def summarize_compaction(report):
+    """Totals for a compaction report: sizes, reduction, status counts and acres mismatches."""
+    bytes_before = sum(entry["bytes_before"] for entry in report)
+    bytes_after = sum(entry["bytes_after"] for entry in report)
+    statuses = {}
+    for entry in report:
+        statuses[entry["status"]] = statuses.get(entry["status"], 0) + 1
+    return {
+        "geometries": len(report),
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after,
+        "reduction": 1 - bytes_after / bytes_before if bytes_before else 0.0,
+        "statuses": statuses,
+        "max_area_drift": max((entry.get("area_drift", 0.0) for entry in report), default=0.0),
+        "acres_mismatches": sum(1 for entry in report if entry.get("acres_mismatch"))
+    }
+
+
+def format_compaction(summary):
+    """One-line description of a summarize_compaction result."""
+    return (f"{summary['geometries']} geometries, {summary['bytes_before'] / 1e6:.2f} MB -> "
+            f"{summary['bytes_after'] / 1e6:.2f} MB ({summary['reduction']:.1%} smaller), "
+            f"{summary['statuses']}, max area drift {summary['max_area_drift']:.3%}, "
+            f"{summary['acres_mismatches']} fields off from enrolled acres")
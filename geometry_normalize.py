@@ -0,0 +1,189 @@
+"""
+Bulk normalization of field boundary geometries.
+
+Boundaries arrive as Polygon or MultiPolygon GeoJSON, as bare coordinate
+arrays, or wrapped in a nested {"type", "crs", "coordinates"} object.
+normalize_geometries classifies every input by nesting depth, builds all
+of them in one pass with shapely 2.x array functions, closes rings, makes
+them valid, orients exteriors counter-clockwise (RFC 7946) and reports any
+parts that had to be dropped. Inputs are never mutated.
+
+Requires shapely 2.1+ (orient_polygons).
+"""
+import json
+import numpy as np
+import shapely
+
+# GeoJSON geometry types by coordinate nesting depth
+DEPTH_TYPES = {3: "Polygon", 4: "MultiPolygon"}
+
+
+def unwrap_coordinates(geometry):
+    """Return the raw coordinate array from a GeoJSON geometry, nested-CRS object or bare array."""
+    if isinstance(geometry, dict):
+        coordinates = geometry.get("coordinates")
+        # Nested format: {"coordinates": {"type": ..., "crs": ..., "coordinates": [...]}}
+        if isinstance(coordinates, dict):
+            return unwrap_coordinates(coordinates)
+        return coordinates
+    return geometry
+
+
+def coordinate_depth(coordinates):
+    """Nesting depth of a coordinate array (2 for a ring, 3 for a Polygon, 4 for a MultiPolygon)."""
+    depth = 0
+    while isinstance(coordinates, (list, tuple)) and coordinates:
+        coordinates = coordinates[0]
+        depth += 1
+    return depth if isinstance(coordinates, (int, float)) else 0
+
+
+def classify_geometry(geometry):
+    """Return 'Polygon', 'MultiPolygon' or None for an input geometry."""
+    return DEPTH_TYPES.get(coordinate_depth(unwrap_coordinates(geometry)))
+
+
+def _polygon_parts(geometry):
+    """List of polygons (each a list of rings) for an input, or None if it is not polygonal."""
+    coordinates = unwrap_coordinates(geometry)
+    geometry_type = DEPTH_TYPES.get(coordinate_depth(coordinates))
+    if geometry_type == "Polygon":
+        return [coordinates]
+    if geometry_type == "MultiPolygon":
+        return coordinates
+    return None
+
+
+def build_geometries(geometries):
+    """
+    Build a shapely MultiPolygon array from raw inputs in one vectorized pass.
+
+    Returns (array, report) where unparseable inputs are None and report
+    holds one dict per input with its input type and dropped ring count.
+    """
+    report = [{"index": i, "input_type": classify_geometry(g), "dropped_rings": 0} for i, g in enumerate(geometries)]
+
+    coords = []
+    ring_index = []
+    polygon_index = []
+    geometry_index = []
+    built = []
+    ring_count = 0
+    polygon_count = 0
+    for i, geometry in enumerate(geometries):
+        parts = _polygon_parts(geometry)
+        if not parts:
+            continue
+        kept_polygons = 0
+        for polygon in parts:
+            shell_kept = False
+            for ring_number, ring in enumerate(polygon):
+                points = [tuple(point[:2]) for point in ring]
+                # A ring needs three distinct points; a degenerate shell drops its holes too
+                if len(set(points)) < 3 or (ring_number > 0 and not shell_kept):
+                    report[i]["dropped_rings"] += 1
+                    continue
+                shell_kept = True
+                coords.extend(points)
+                ring_index.extend([ring_count] * len(points))
+                polygon_index.append(polygon_count)
+                ring_count += 1
+            if shell_kept:
+                geometry_index.append(len(built))
+                polygon_count += 1
+                kept_polygons += 1
+        if kept_polygons:
+            built.append(i)
+
+    result = np.full(len(geometries), None, dtype=object)
+    if built:
+        rings = shapely.linearrings(np.asarray(coords, dtype=float), indices=ring_index)  # closes open rings
+        polygons = shapely.polygons(rings, indices=polygon_index)
+        result[built] = shapely.multipolygons(polygons, indices=geometry_index)
+    return result, report
+
+
+def _polygonal_parts(geometries):
+    """Explode geometries to polygons, returning (polygons, source index, non-polygonal part index)."""
+    parts, index = shapely.get_parts(geometries, return_index=True)
+    # make_valid can return collections holding multipolygons
+    nested = shapely.get_type_id(parts) == 6
+    if nested.any():
+        sub_parts, sub_index = shapely.get_parts(parts[nested], return_index=True)
+        parts = np.concatenate([parts[~nested], sub_parts])
+        index = np.concatenate([index[~nested], index[nested][sub_index]])
+    is_polygon = (shapely.get_type_id(parts) == 3) & ~shapely.is_empty(parts)
+    return parts[is_polygon], index[is_polygon], index[~is_polygon]
+
+
+def normalize_geometries(geometries, output_type="MultiPolygon"):
+    """
+    Normalize a sequence of raw boundary geometries.
+
+    Args:
+        geometries (list): GeoJSON geometries, nested-CRS objects or bare coordinate arrays
+        output_type (str): "MultiPolygon" keeps every part; "Polygon" keeps the
+            largest part and reports the rest as dropped
+
+    Returns:
+        tuple: (list of GeoJSON geometry dicts or None, list of per-input report dicts)
+    """
+    shapes, report = build_geometries(geometries)
+    present = np.flatnonzero(shapes != None)  # noqa: E711 - elementwise comparison
+
+    if len(present):
+        candidates = shapes[present]
+        invalid = ~shapely.is_valid(candidates)
+        for position in np.flatnonzero(invalid):
+            report[present[position]]["repaired"] = True
+        candidates[invalid] = shapely.make_valid(candidates[invalid])
+
+        polygons, owner, dropped_owner = _polygonal_parts(candidates)
+        for position in dropped_owner:
+            report[present[position]]["dropped_parts"] = report[present[position]].get("dropped_parts", 0) + 1
+
+        areas = shapely.area(polygons)
+        if output_type == "Polygon" and len(polygons):
+            # Keep the largest polygon of each geometry
+            order = np.lexsort((-areas, owner))
+            first = np.ones(len(order), dtype=bool)
+            first[1:] = owner[order][1:] != owner[order][:-1]
+            keep = order[first]
+            for position in order[~first]:
+                entry = report[present[owner[position]]]
+                entry["dropped_parts"] = entry.get("dropped_parts", 0) + 1
+                entry["dropped_area"] = entry.get("dropped_area", 0.0) + float(areas[position])
+            polygons, owner = polygons[keep], owner[keep]
+
+        polygons = shapely.orient_polygons(polygons, exterior_cw=False)
+        shapes = np.full(len(geometries), None, dtype=object)
+        if len(polygons):
+            kept = np.unique(owner)
+            contiguous = np.searchsorted(kept, owner)
+            order = np.argsort(contiguous, kind="stable")
+            if output_type == "Polygon":
+                shapes[present[owner]] = polygons
+            else:
+                shapes[present[kept]] = shapely.multipolygons(polygons[order], indices=contiguous[order])
+
+    for entry, shape in zip(report, shapes):
+        if shape is None:
+            entry["status"] = "empty" if entry["input_type"] else "unparseable"
+        elif entry.get("dropped_parts") or entry["dropped_rings"]:
+            entry["status"] = "dropped_parts"
+        else:
+            entry["status"] = "repaired" if entry.get("repaired") else "ok"
+
+    output = [None] * len(shapes)
+    present = np.flatnonzero(shapes != None)  # noqa: E711 - elementwise comparison
+    for i, text in zip(present, shapely.to_geojson(shapes[present])):
+        output[i] = json.loads(text)
+    return output, report
+
+
+def summarize_report(report):
+    """Count report entries by status, e.g. {'ok': 98, 'repaired': 1, 'dropped_parts': 1}."""
+    counts = {}
+    for entry in report:
+        counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+    return counts
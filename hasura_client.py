@@ -0,0 +1,68 @@
+"""
+Shared, pooled client for the EcoHarvest Hasura GraphQL endpoint.
+
+Every query goes through one keep-alive requests.Session with a sized
+connection pool and urllib3 backoff on 429/5XX, so concurrent fetchers
+reuse connections instead of opening one per request. The admin secret
+comes from HASURA_ADMIN_SECRET.
+
+Retries re-send the POST, which is only safe for queries; pass retries=0
+for a client used to send mutations.
+"""
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+HASURA_URL = "https://graphql.ecoharvest.ag/v1/graphql"
+
+
+class HasuraClient:
+    """Thread-safe GraphQL client over a pooled requests.Session."""
+
+    def __init__(self, url=HASURA_URL, admin_secret=None, pool_size=8, retries=3, backoff_factor=1.0, timeout=120):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "x-hasura-admin-secret": admin_secret or os.environ.get("HASURA_ADMIN_SECRET", "EnterSecret")
+        })
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["POST"],
+            respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def post(self, query, variables=None):
+        """Send a GraphQL document and return the raw response."""
+        return self.session.post(self.url, json={"query": query, "variables": variables or {}}, timeout=self.timeout)
+
+    def query(self, query, variables=None):
+        """Run a GraphQL query and return its data block, raising on HTTP or GraphQL errors."""
+        response = self.post(query, variables)
+        response.raise_for_status()
+        response_data = response.json()
+        if "errors" in response_data:
+            raise ValueError(f"GraphQL errors: {response_data['errors']}")
+        return response_data["data"]
+
+
+# Shared client for scripts that only need one
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide HasuraClient, creating it on first use."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = HasuraClient()
+        return _default_client
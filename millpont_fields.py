@@ -1,57 +1,6 @@
-import time
-import requests
 import json
 import csv
-from datetime import datetime
-
-# Token management
-token = None
-token_expiry = 0
-
-def get_token():
-    global token, token_expiry
-    url = "https://api.meti.millpont.com/token"
-    payload = {
-        "email": "email",
-        "password": "password"
-    }
-    
-    # Create a session for consistent headers
-    session = requests.Session()
-    session.headers.update({
-        "Content-Type": "application/json",
-        "Accept": "application/json"
-    })
-    
-    response = session.post(url, json=payload)
-    print(f"Status code: {response.status_code}")
-    
-    if response.status_code == 200:
-        try:
-            # Store raw token without any modifications
-            token = response.text.strip()
-            token_expiry = time.time() + 3600
-            
-            # Set the raw token as the Authorization header
-            session.headers["Authorization"] = token
-            
-            # Test the token
-            test_response = session.get("https://api.meti.millpont.com/sources")
-            print(f"\nToken test:")
-            print(f"Status: {test_response.status_code}")
-            print(f"Response: {test_response.text}")
-            
-            if test_response.status_code == 200:
-                print("Token working correctly!")
-                return session
-            else:
-                raise ValueError("Token test failed")
-            
-        except Exception as e:
-            print(f"Error processing token: {str(e)}")
-            raise
-    else:
-        raise ValueError(f"Authentication failed: {response.text}")
+from api.millpont_auth import MillpontClient
 
 def standardize_geojson(field):
     """
@@ -113,7 +62,7 @@ def create_millpont_feature(field):
 
 def process_fields():
     try:
-        session = get_token()
+        client = MillpontClient().authenticate()
         
         # Read the GeoJSON file
         with open('CIFCSC_2024.geojson', 'r') as f:
@@ -128,12 +77,10 @@ def process_fields():
                     "features": [create_millpont_feature(field)]
                 }
                 
-                url = "https://api.meti.millpont.com/sources"
-                
                 print(f"\nProcessing field: {field['properties'].get('name', 'unknown')}")
                 
-                # Make request using session with raw token
-                response = session.post(url, json=feature_collection)
+                # Make request through the shared client
+                response = client.post("sources", json=feature_collection)
                 print(f"Response status: {response.status_code}")
                 
                 if response.status_code == 200:
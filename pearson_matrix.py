@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 from scipy.stats import pearsonr
+from verified_data import load_verified
 
 def encode_dates(date_series):
     return pd.to_datetime(date_series).map(pd.Timestamp.toordinal)
@@ -11,7 +12,10 @@ def encode_categorical(data):
 def compute_correlations(data, main_col, other_cols):
     correlations = {}
     for col in other_cols:
-        if data[col].dtype == 'object':
+        if isinstance(data[col].dtype, pd.CategoricalDtype):
+            # Codes of the categories present, as encode_categorical would give
+            temp_data = data[col].cat.remove_unused_categories().cat.codes
+        elif data[col].dtype == 'object':
             try:
                 # Try to convert it to datetime if it looks like a date
                 temp_data = encode_dates(data[col])
@@ -36,19 +40,19 @@ def compute_correlations(data, main_col, other_cols):
     return correlations
 
 def main():
-    # Load the data
-    df = pd.read_csv('2022_Verified.csv')
-    
-    # Prepare the Excel writer
-    writer = pd.ExcelWriter('Project_Correlations.xlsx', engine='xlsxwriter')
-    
     # Columns to correlate with 'removed'
     columns_to_correlate = ['Commodity', 'Date (Cover Crop Planting)', 'soil_avg_soc', 
                             'soil_avg_bulkdensity', 'soil_clay_fraction', 
                             'optis_tillage_fall__value', 'optis_tillage_spring__value']
+
+    # Load the data
+    df = load_verified('2022_Verified.csv', columns=['Project', 'removed'] + columns_to_correlate)
+    
+    # Prepare the Excel writer
+    writer = pd.ExcelWriter('Project_Correlations.xlsx', engine='xlsxwriter')
     
     # Iterate over each project
-    for project_name, group in df.groupby('Project'):
+    for project_name, group in df.groupby('Project', observed=True):
         correlations = compute_correlations(group, 'removed', columns_to_correlate)
         pd.DataFrame.from_dict(correlations, orient='index', columns=['Correlation']).to_excel(writer, sheet_name=project_name)
     
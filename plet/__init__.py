@@ -0,0 +1,19 @@
+"""PLET input generation; see plet.fields for the library and `python -m plet` for the CLI."""
+from .fields import (
+    BMP_MAPPING,
+    PLET_CRS,
+    PRIORITY_ORDER,
+    project_names,
+    build_plet_input,
+    extract_coordinates,
+    fetch_acres_summary,
+    fetch_field_acres,
+    fetch_field_details,
+    fetch_field_pages,
+    fetch_project_acres,
+    get_plet_data,
+    plet_features,
+    run_pipeline,
+    transform_to_plet_format,
+    write_acres_summary,
+)
@@ -0,0 +1,63 @@
+import argparse
+
+from .fields import PRIORITY_ORDER, get_plet_data, run_pipeline, write_acres_summary
+
+
+def main(argv=None, default_priority=PRIORITY_ORDER):
+    """
+    Command line entry point (python -m plet).
+
+    By default each project/year is fetched in one query and written as
+    {abbr}_{year}.json, {abbr}_{year}.geojson and plet_{year}.geojson.
+    --stream builds the PLET inputs with the paginated, concurrent pipeline
+    instead, and --acres-summary writes one acreage workbook for every
+    project and year from a single aggregate query.
+    """
+    parser = argparse.ArgumentParser(prog="plet", description="Build PLET input files from MRV field boundaries")
+    parser.add_argument("--projects", nargs="+", default=["CIFCSC"], help="Project abbreviations")
+    parser.add_argument("--years", nargs="+", type=int, default=[2024], help="Years to process")
+    parser.add_argument("--priority", nargs="+", default=list(default_priority),
+                        help="Practice change abbreviations, highest priority first")
+    parser.add_argument("--simplify-tolerance", type=float,
+                        help="Topology-preserving simplification tolerance in degrees (e.g. 0.00001)")
+    parser.add_argument("--precision", type=int, help="Round coordinates to this many decimals (e.g. 6)")
+    parser.add_argument("--validate-acres", type=float, metavar="TOLERANCE",
+                        help="Flag fields whose acres differ from the boundary by more than this share (e.g. 0.05)")
+    parser.add_argument("--fix-acres", action="store_true",
+                        help="With --validate-acres, replace flagged acres with the boundary's acres")
+    parser.add_argument("--acres-summary", action="store_true",
+                        help="Write the project acreage workbook for all --years instead of PLET inputs")
+    parser.add_argument("--field-details", action="store_true",
+                        help="With --acres-summary, add a Field Level Details sheet (paged by --page-size)")
+
+    stream = parser.add_argument_group("streaming pipeline")
+    stream.add_argument("--stream", action="store_true",
+                        help="Page through fields and fetch every project/year concurrently")
+    stream.add_argument("--format", choices=["geojson", "geojson.gz", "parquet"], default="geojson.gz",
+                        help="Compact GeoJSON, gzipped GeoJSON or GeoParquet")
+    stream.add_argument("--page-size", type=int, default=500, help="Fields per API page")
+    stream.add_argument("--workers", type=int, default=4, help="Concurrent project-year fetches")
+    stream.add_argument("--output-dir", default=".", help="Directory for PLET input files")
+    stream.add_argument("--store", help="Local field store (SQLite); only changed fields are fetched")
+    args = parser.parse_args(argv)
+
+    if args.acres_summary:
+        write_acres_summary(args.years, include_fields=args.field_details, page_size=args.page_size)
+    elif args.stream:
+        store = None
+        if args.store:
+            from field_store import FieldStore
+            store = FieldStore(args.store)
+        run_pipeline(args.projects, args.years, args.output_dir, args.format, args.page_size, args.workers,
+                     args.simplify_tolerance, args.precision, args.priority, store,
+                     args.validate_acres, args.fix_acres)
+    else:
+        for abbr in args.projects:
+            for year in args.years:
+                plet_data = get_plet_data(abbr, year, args.simplify_tolerance, args.precision, args.priority,
+                                          acres_tolerance=args.validate_acres, fix_acres=args.fix_acres)
+                if plet_data:
+                    print(f"Successfully transformed data for project {abbr} in year {year}")
+                    print(f"Number of fields processed: {len(plet_data['features'])}")
+                else:
+                    print(f"Failed to process data for project {abbr} in year {year}")
@@ -0,0 +1,704 @@
+"""
+PLET input generation from MRV field boundaries.
+
+Library functions for fetching fields from Hasura, choosing one practice
+change per field and writing PLET-ready MultiPolygon GeoJSON, either in a
+single shot (get_plet_data) or as a paginated, concurrent streaming
+pipeline (run_pipeline). Importing this module never touches the network;
+all queries go through the shared pooled HasuraClient.
+
+Output follows the PLET FeatureCollection layout: CRS84, one MultiPolygon
+per field with id, field_id, user_lu, n_months, m_area_ac, bmp_name and
+bmp_ac properties.
+"""
+import json
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from geometry_normalize import normalize_geometries, summarize_report
+from geojson_io import FeatureCollectionWriter
+from hasura_client import HasuraClient, get_client
+
+project_names = {
+    "SNW": "Sustainable NW",
+    "GC": "Great Lakes Project",
+    "GM-NE": "General Mills-Native Energy",
+    "BRANDY": "Brandywine-Christina Pilot",
+    "LANCPA": "Lancaster Pilot",
+    "SHENVA": "Shenandoah Valley Pilot",
+    "MDLZ": "Mondelez Wheat",
+    "TNCWF": "TNC/WWF (Northern Great Plains)",
+    "TNCOH": "TNC Ohio",
+    "PNWWA": "Pacific NW (WA)",
+    "SN": "Syngenta-Nutrien",
+    "NAL": "NASA Ag Lab",
+    "SLM": "SLM Partners",
+    "MOCS": "Missouri Partnership Pilot",
+    "AGIP": "AGI SGP Pipeline",
+    "NPC": "Northern Plains Cropping",
+    "NJ_RCD": "New Jersey Resource and Conservation Department",
+    "CTNUSCTP": "Cotton USCTP",
+    "CIFCSC": "CIF Climate Smart",
+    "LT": "Laura Test",
+    "PGT": "PG Test Project",
+    "KC": "Kimberly-Clark",
+    "NGP-PFQF": "NGP-PFQF Research",
+    "NPCRED": "Northern Plains Cropping Reductions Accounting",
+    "SGPNACDP": "SGP-NACD Pilot",
+    "NACDSGP": "NACD SGP Market",
+    "SGP": "Southern Great Plains",
+    "CN": "Corteva",
+    "TNCNE": "TNC Nebraska",
+    "FJFCSC": "FJF CSC Grazing",
+    "SOR": "Sorghum",
+    "CTNMNU": "Cotton Manulife",
+    "CNFA": "CA Nut Fruit (Almond Board)",
+    "MOBIO": "Missouri Biodiversity Pilot",
+    "NGPNACDP": "NGP-NACD Pipeline",
+    "KSBD": "Kansas PFQF Biodiversity",
+    "DAIRY": "Trinkler Dairy",
+    "NGPNACDM": "NGP-NACD Market",
+    "TNCMN": "TNC Minnesota",
+    "AGIM": "AGI SGP Market"
+}
+
+# Function to fetch field details based on abbreviation and year
+def fetch_field_details(abbr="%", year=None, client=None):
+    query = """
+    query FieldDetails($abbr: String = "%", $year: smallint!) {
+      farmField(where: {
+        many_field_has_many_practice_changes: {practice_change: {abbreviation: {_nin: ["PE", "UE"]}}, year: {_eq: $year}}, 
+        seasons: {year: {_eq: $year}},
+        farmer_project_fields: {farmer_project: {project: {abbreviation: {_ilike: $abbr}}}}
+      }) {
+        id
+        name
+        acres
+        boundary
+        boundaryArray
+        subboundaries
+        many_field_has_many_practice_changes {
+          practice_change {
+            abbreviation
+            name
+            description
+          }
+          year
+        }
+        app_user {
+          displayName
+          id
+          email
+          phone
+          street
+          city
+          state {
+            stusps
+          }
+          zipcode
+        }
+        farmer_project_fields {
+          farmer_project {
+            project {
+              name
+              abbreviation
+              id
+            }
+          }
+        }
+      }
+    }
+    """
+
+    variables = {
+        "abbr": abbr,
+        "year": year
+    }
+
+    response = (client or get_client()).post(query, variables)
+
+    if response.status_code == 200:
+        print("Query successful!")
+        response_data = response.json()
+        
+        project_abbr = abbr
+        file_name_base = f"{project_abbr}_{year}"
+
+        # Save response as JSON
+        json_path = Path(f"{file_name_base}.json")
+        with open(json_path, "w") as json_file:
+            json.dump(response_data, json_file, indent=2)
+        print(f"Saved JSON file: {json_path}")
+
+        # Create and save GeoJSON with practice change information
+        features = []
+        for field in response_data["data"]["farmField"]:
+            # Process practice changes
+            practice_changes = []
+            if field.get("many_field_has_many_practice_changes"):
+                for pc in field["many_field_has_many_practice_changes"]:
+                    if pc["practice_change"]:
+                        practice_changes.append({
+                            "abbreviation": pc["practice_change"]["abbreviation"],
+                            "name": pc["practice_change"]["name"],
+                            "description": pc["practice_change"]["description"]
+                        })
+
+            features.append({
+                "type": "Feature",
+                "properties": {
+                    "id": field["id"],
+                    "name": field["name"],
+                    "email": field["app_user"]["email"] if field["app_user"] else None,
+                    "displayName": field["app_user"]["displayName"] if field["app_user"] else None,
+                    "practice_changes": practice_changes
+                },
+                "geometry": {
+                    "type": "Polygon",
+                    "coordinates": field["boundaryArray"] if field["boundaryArray"] else field["boundary"]
+                }
+            })
+
+        geojson_data = {
+            "type": "FeatureCollection",
+            "features": features
+        }
+
+        geojson_path = Path(f"{file_name_base}.geojson")
+        with open(geojson_path, "w") as geojson_file:
+            json.dump(geojson_data, geojson_file, indent=2)
+        print(f"Saved GeoJSON file: {geojson_path}")
+
+        return response_data
+    else:
+        print(f"Query failed with status code {response.status_code}")
+        print(response.text)
+        return None
+
+# Enrolled-field filter shared by the acreage queries; %(year)s names the year
+# variable and %(project)s is the project filter (see project_filter)
+ACRES_WHERE = """{
+        many_field_has_many_practice_changes: {practice_change: {abbreviation: {_nin: ["PE", "UE"]}}, year: {_eq: $%(year)s}},
+        seasons: {year: {_eq: $%(year)s}},
+        farmer_project_fields: {farmer_project: {project: %(project)s}}
+      }"""
+
+FIELD_ACRES_PAGE_QUERY = """
+query FieldAcresPage(%(abbrs)s, $year: smallint!, $limit: Int!, $offset: Int!) {
+  farmField(where: %(where)s, order_by: {id: asc}, limit: $limit, offset: $offset) {
+    id
+    name
+    acres
+    many_field_has_many_practice_changes {
+      practice_change {
+        abbreviation
+      }
+    }
+    farmer_project_fields {
+      farmer_project {
+        project {
+          name
+          abbreviation
+          id
+        }
+      }
+    }
+  }
+}
+"""
+
+def project_filter(variables):
+    """
+    Case-insensitive project filter on abbreviation variables ($abbr0, ...).
+
+    Uses _ilike like the single-project queries; several projects are
+    combined with _or.
+    """
+    predicates = [f"{{abbreviation: {{_ilike: ${variable}}}}}" for variable in variables]
+    return predicates[0] if len(predicates) == 1 else f"{{_or: [{', '.join(predicates)}]}}"
+
+def field_acres_page_query(count):
+    """FIELD_ACRES_PAGE_QUERY for count projects, passed as $abbr0 ... $abbr{count-1}."""
+    variables = [f"abbr{i}" for i in range(count)]
+    where = ACRES_WHERE % {"year": "year", "project": project_filter(variables)}
+    declarations = ", ".join(f"${variable}: String!" for variable in variables)
+    return FIELD_ACRES_PAGE_QUERY % {"abbrs": declarations, "where": where}
+
+def acres_aggregate_query(abbrs, years):
+    """
+    Build one GraphQL document with a farmField_aggregate alias per project and year.
+
+    Returns (query, variables, aliases) where aliases maps each alias to its (abbr, year).
+    """
+    declarations = [f"$abbr{i}: String" for i in range(len(abbrs))]
+    declarations += [f"$year{j}: smallint!" for j in range(len(years))]
+    selections = []
+    aliases = {}
+    for i, abbr in enumerate(abbrs):
+        for j, year in enumerate(years):
+            alias = f"p{i}_y{j}"
+            aliases[alias] = (abbr, year)
+            where = ACRES_WHERE % {"year": f"year{j}", "project": project_filter([f"abbr{i}"])}
+            selections.append(f"""
+      {alias}: farmField_aggregate(where: {where}) {{
+        aggregate {{
+          count(columns: acres)
+          sum {{
+            acres
+          }}
+        }}
+      }}""")
+    query = f"query ProjectAcres({', '.join(declarations)}) {{{''.join(selections)}\n    }}"
+    variables = {f"abbr{i}": abbr for i, abbr in enumerate(abbrs)}
+    variables.update({f"year{j}": year for j, year in enumerate(years)})
+    return query, variables, aliases
+
+def fetch_project_acres(years, projects=None, client=None):
+    """
+    Field count and total acres per project and year in a single aggregate query.
+
+    Counts only fields with acres set, as the per-project summary always has.
+    Returns a list of summary rows for projects with at least one field.
+    """
+    projects = projects or project_names
+    query, variables, aliases = acres_aggregate_query(list(projects), list(years))
+    data = (client or get_client()).query(query, variables)
+
+    summary_data = []
+    for alias, (abbr, year) in aliases.items():
+        aggregate = data[alias]["aggregate"]
+        if aggregate["count"] > 0:
+            summary_data.append({
+                "project_abbreviation": abbr,
+                "project_name": projects[abbr],
+                "field_count": aggregate["count"],
+                "total_acres": aggregate["sum"]["acres"],
+                "year": year
+            })
+    return sorted(summary_data, key=lambda row: (row["year"], row["project_abbreviation"]))
+
+def fetch_field_acres(years, projects=None, page_size=1000, client=None):
+    """
+    Yield field-level acreage rows for every project, paging through farmField per year.
+
+    A field enrolled in several of the projects yields one row per project.
+    """
+    projects = projects or project_names
+    client = client or get_client()
+    query = field_acres_page_query(len(projects))
+    abbrs = {f"abbr{i}": abbr for i, abbr in enumerate(projects)}
+    # Abbreviations are matched case-insensitively, as in the query
+    by_lower = {abbr.lower(): abbr for abbr in projects}
+    for year in years:
+        offset = 0
+        while True:
+            variables = {**abbrs, "year": year, "limit": page_size, "offset": offset}
+            page = client.query(query, variables)["farmField"]
+            for field in page:
+                practice_changes = [pc["practice_change"]["abbreviation"] for pc in field["many_field_has_many_practice_changes"]]
+                practice_change = ", ".join(practice_changes) if practice_changes else "None"
+                field_projects = {
+                    by_lower[project["abbreviation"].lower()]
+                    for fpf in field["farmer_project_fields"]
+                    for project in [(fpf.get("farmer_project") or {}).get("project")]
+                    if project and (project.get("abbreviation") or "").lower() in by_lower
+                }
+                for abbr in sorted(field_projects):
+                    yield {
+                        "project_abbreviation": abbr,
+                        "project_name": projects[abbr],
+                        "field_id": field["id"],
+                        "field_name": field["name"],
+                        "acres": field.get("acres"),
+                        "practice_change": practice_change,
+                        "year": year
+                    }
+            if len(page) < page_size:
+                break
+            offset += page_size
+
+def write_acres_summary(years, excel_file_path=None, include_fields=False, page_size=1000, client=None):
+    """
+    Write the project acreage workbook for all projects and years.
+
+    The Project Summary sheet comes from one aggregate query; with
+    include_fields a Field Level Details sheet is filled from a paginated
+    field pull (one page sequence per year).
+    """
+    # pandas is only needed here, so importing the transform stays cheap
+    import pandas as pd
+
+    years = list(years)
+    summary_df = pd.DataFrame(fetch_project_acres(years, client=client))
+    if excel_file_path is None:
+        label = str(years[0]) if len(years) == 1 else f"{min(years)}-{max(years)}"
+        excel_file_path = Path(f"project_acres_summary_{label}.xlsx")
+
+    with pd.ExcelWriter(excel_file_path) as writer:
+        summary_df.to_excel(writer, sheet_name="Project Summary", index=False)
+        if include_fields:
+            field_level_df = pd.DataFrame(fetch_field_acres(years, page_size=page_size, client=client))
+            field_level_df.to_excel(writer, sheet_name="Field Level Details", index=False)
+
+    print(f"Excel file saved: {excel_file_path}")
+    return excel_file_path
+
+# Function to fetch and sum acres for each project abbreviation
+def fetch_acres_summary(year, client=None):
+    """Write project_acres_summary_{year}.xlsx with project and field-level sheets."""
+    return write_acres_summary([year], include_fields=True, client=client)
+
+def extract_coordinates(field_data):
+    """
+    Helper function to extract coordinates from boundary or boundaryArray
+    
+    Args:
+        field_data (dict): Field data containing boundary or boundaryArray
+    
+    Returns:
+        list: Raw Polygon or MultiPolygon coordinates
+    """
+    # First try boundaryArray, then fall back to boundary
+    boundary_data = field_data.get("boundaryArray") or field_data.get("boundary")
+    
+    if isinstance(boundary_data, dict) and "coordinates" in boundary_data:
+        return boundary_data["coordinates"]
+    return boundary_data
+
+# Practice change mapping
+BMP_MAPPING = {
+    "CC": "cov_crop_2",
+    "TR": "cons_till_1",
+    "NM": "nutrient_mgmt_1"
+}
+
+# Practice change priority (highest to lowest)
+PRIORITY_ORDER = ["NM", "CC", "TR"]
+
+PLET_CRS = {
+    "type": "name",
+    "properties": {
+        "name": "urn:ogc:def:crs:OGC:1.3:CRS84"
+    }
+}
+
+def plet_features(fields, year, priority_order=PRIORITY_ORDER):
+    """
+    Convert a list of farmField records to PLET features.
+    
+    Args:
+        fields (list): farmField records (one API page or a full response)
+        year (int): Year to process
+        priority_order (list): Practice change abbreviations, highest priority first
+    
+    Returns:
+        list: PLET GeoJSON features for fields with a prioritized practice change
+    """
+    selected = []
+    
+    for field in fields:
+        # Get practice changes for the specified year
+        practice_changes = []
+        for pc in field.get("many_field_has_many_practice_changes", []):
+            if pc["year"] == year and pc["practice_change"]["abbreviation"] in priority_order:
+                practice_changes.append(pc["practice_change"]["abbreviation"])
+        
+        # Skip if no relevant practice changes
+        if not practice_changes:
+            continue
+            
+        # Select highest priority practice change
+        selected_practice = None
+        for practice in priority_order:
+            if practice in practice_changes:
+                selected_practice = practice
+                break
+        
+        # Skip if no matching practice change found
+        if not selected_practice:
+            continue
+        
+        selected.append((field, selected_practice))
+    
+    # Normalize every boundary to a valid MultiPolygon in one pass
+    geometries, report = normalize_geometries([extract_coordinates(field) for field, _ in selected])
+    print(f"Geometry normalization: {summarize_report(report)}")
+    
+    features = []
+    for (field, selected_practice), geometry, entry in zip(selected, geometries, report):
+        if not geometry:
+            print(f"Warning: No valid coordinates found for field {field['id']}, skipping...")
+            continue
+        if entry.get("dropped_parts") or entry["dropped_rings"]:
+            print(f"Warning: Dropped {entry.get('dropped_parts', 0)} parts and {entry['dropped_rings']} rings from field {field['id']}")
+            
+        # Create feature
+        feature = {
+            "type": "Feature",
+            "properties": {
+                "id": str(field["id"]),
+                "field_id": field["name"],
+                "user_lu": "cropland",
+                "n_months": 12,
+                "m_area_ac": float(field["acres"]) if field["acres"] is not None else 0.0,
+                "bmp_name": BMP_MAPPING[selected_practice],
+                "bmp_ac": float(field["acres"]) if field["acres"] is not None else 0.0
+            },
+            "geometry": geometry
+        }
+        
+        features.append(feature)
+    
+    return features
+
+def compact_plet_features(features, tolerance=None, precision=None):
+    """
+    Optionally simplify and quantize PLET geometries for upload.
+    
+    Returns (features, compaction report); the report is empty when neither
+    a tolerance nor a precision is given. Areas are validated against m_area_ac.
+    """
+    if tolerance is None and precision is None:
+        return features, []
+    from geometry_export import compact_features
+    return compact_features(features, "m_area_ac", tolerance=tolerance, precision=precision)
+
+def check_plet_acres(features, label, acres_tolerance=None, fix_acres=False):
+    """
+    Optionally validate m_area_ac/bmp_ac against each boundary's equal-area acres.
+    
+    Features whose stated acres differ by more than acres_tolerance (relative)
+    are reported, and replaced with the computed acres when fix_acres is set.
+    """
+    if acres_tolerance is None:
+        return features
+    from acreage import validate_acres, summarize_validation
+    features, report = validate_acres(features, ("m_area_ac", "bmp_ac"), acres_tolerance, fix_acres)
+    print(f"Acres validation for {label}: {summarize_validation(report)}")
+    for feature, entry in zip(features, report):
+        if entry["status"] in ("flagged", "fixed"):
+            print(f"  Field {feature['properties']['field_id']}: stated {entry['m_area_ac']} acres, "
+                  f"boundary {entry['computed_acres']} acres ({entry['status']})")
+    return features
+
+def report_compaction(label, compaction):
+    """Print the size reduction and area checks of a compaction report."""
+    if compaction:
+        from geometry_export import summarize_compaction, format_compaction
+        print(f"Export compaction for {label}: {format_compaction(summarize_compaction(compaction))}")
+
+def transform_to_plet_format(input_data, year, tolerance=None, precision=None, priority_order=PRIORITY_ORDER,
+                             acres_tolerance=None, fix_acres=False):
+    """
+    Transform field data to PLET format with practice change prioritization.
+    
+    Args:
+        input_data (dict): The response data from fetch_field_details
+        year (int): Year to process
+        tolerance (float): Optional simplification tolerance in degrees
+        precision (int): Optional number of coordinate decimals to keep
+        priority_order (list): Practice change abbreviations, highest priority first
+        acres_tolerance (float): Flag stated acres further than this (relative) from the boundary
+        fix_acres (bool): Replace flagged acres with the boundary's acres
+    """
+    features = plet_features(input_data["data"]["farmField"], year, priority_order)
+    features = check_plet_acres(features, year, acres_tolerance, fix_acres)
+    features, compaction = compact_plet_features(features, tolerance, precision)
+    report_compaction(year, compaction)
+    
+    # Create final GeoJSON structure
+    plet_geojson = {
+        "type": "FeatureCollection",
+        "name": f"field_output_{year}",
+        "crs": PLET_CRS,
+        "features": features
+    }
+    
+    # Save to file
+    output_path = Path(f"plet_{year}.geojson")
+    with open(output_path, "w") as f:
+        json.dump(plet_geojson, f, indent=2)
+    
+    print(f"Saved PLET GeoJSON file: {output_path}")
+    return plet_geojson
+
+def get_plet_data(abbr, year, tolerance=None, precision=None, priority_order=PRIORITY_ORDER, client=None,
+                  acres_tolerance=None, fix_acres=False):
+    """
+    Fetch field details and transform to PLET format.
+    
+    Args:
+        abbr (str): Project abbreviation
+        year (int): Year to process
+        tolerance (float): Optional simplification tolerance in degrees
+        precision (int): Optional number of coordinate decimals to keep
+        priority_order (list): Practice change abbreviations, highest priority first
+        client (HasuraClient): Client to query with; defaults to the shared client
+        acres_tolerance (float): Flag stated acres further than this (relative) from the boundary
+        fix_acres (bool): Replace flagged acres with the boundary's acres
+    """
+    # Get field details
+    field_data = fetch_field_details(abbr=abbr, year=year, client=client)
+    
+    # Transform to PLET format
+    if field_data:
+        plet_data = transform_to_plet_format(field_data, year, tolerance, precision, priority_order,
+                                             acres_tolerance, fix_acres)
+        return plet_data
+    return None
+
+# Paginated field query used by the pipeline; only what the PLET transform needs
+FIELD_PAGE_QUERY = """
+query FieldPage($abbr: String = "%", $year: smallint!, $limit: Int!, $offset: Int!) {
+  farmField(
+    where: {
+      many_field_has_many_practice_changes: {practice_change: {abbreviation: {_nin: ["PE", "UE"]}}, year: {_eq: $year}},
+      seasons: {year: {_eq: $year}},
+      farmer_project_fields: {farmer_project: {project: {abbreviation: {_ilike: $abbr}}}}
+    },
+    order_by: {id: asc},
+    limit: $limit,
+    offset: $offset
+  ) {
+    id
+    name
+    acres
+    boundary
+    boundaryArray
+    many_field_has_many_practice_changes {
+      practice_change {
+        abbreviation
+      }
+      year
+    }
+  }
+}
+"""
+
+def fetch_field_pages(client, abbr, year, page_size=500):
+    """Yield farmField pages for a project and year using limit/offset pagination."""
+    offset = 0
+    while True:
+        variables = {"abbr": abbr, "year": year, "limit": page_size, "offset": offset}
+        page = client.query(FIELD_PAGE_QUERY, variables)["farmField"]
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        offset += page_size
+
+# Column types of the PLET properties in GeoParquet output; declared up front
+# because a page where a column is all None would otherwise type it as null
+PLET_PARQUET_COLUMNS = {
+    "id": "string",
+    "field_id": "string",
+    "user_lu": "string",
+    "n_months": "int64",
+    "m_area_ac": "float64",
+    "bmp_name": "string",
+    "bmp_ac": "float64"
+}
+
+class GeoParquetWriter:
+    """Append PLET features to a GeoParquet file (WKB geometry) one page at a time."""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def write_features(self, features):
+        if not features:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        import shapely
+
+        if self._writer is None:
+            geo = {
+                "version": "1.0.0",
+                "primary_column": "geometry",
+                "columns": {"geometry": {"encoding": "WKB", "geometry_types": ["MultiPolygon"]}}
+            }
+            schema = pa.schema(
+                [(key, pa.type_for_alias(alias)) for key, alias in PLET_PARQUET_COLUMNS.items()]
+                + [("geometry", pa.binary())],
+                metadata={b"geo": json.dumps(geo).encode()}
+            )
+            self._writer = pq.ParquetWriter(self.path, schema)
+
+        geometries = shapely.from_geojson([json.dumps(f["geometry"]) if f["geometry"] else None for f in features])
+        columns = {key: [f["properties"].get(key) for f in features] for key in PLET_PARQUET_COLUMNS}
+        columns["geometry"] = shapely.to_wkb(geometries)
+        self._writer.write_table(pa.table(columns, schema=self._writer.schema))
+        self.count += len(features)
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._writer is not None:
+            self._writer.close()
+        return False
+
+def build_plet_input(client, abbr, year, output_dir=".", output_format="geojson.gz", page_size=500,
+                     tolerance=None, precision=None, priority_order=PRIORITY_ORDER, store=None,
+                     acres_tolerance=None, fix_acres=False):
+    """
+    Stream one project-year from the API into a PLET input file.
+    
+    Each page is transformed (and optionally compacted) and written as soon
+    as it arrives, so only one page of fields is held in memory. With a
+    FieldStore, only changed fields are pulled into the store and the pages
+    are read locally.
+    
+    Returns:
+        tuple: (output path, number of PLET features written)
+    """
+    output_path = Path(output_dir) / f"plet_{abbr}_{year}.{output_format}"
+    if output_format == "parquet":
+        writer = GeoParquetWriter(output_path)
+    else:
+        writer = FeatureCollectionWriter(output_path, name=f"field_output_{abbr}_{year}", crs=PLET_CRS)
+    if store is not None:
+        store.sync(abbr, year, client, page_size)
+        pages = store.record_pages(abbr, year, page_size)
+    else:
+        pages = fetch_field_pages(client, abbr, year, page_size)
+    compaction = []
+    with writer:
+        for page in pages:
+            features = check_plet_acres(plet_features(page, year, priority_order), f"{abbr} {year}",
+                                        acres_tolerance, fix_acres)
+            features, page_compaction = compact_plet_features(features, tolerance, precision)
+            compaction.extend(page_compaction)
+            if output_format == "parquet":
+                writer.write_features(features)
+            else:
+                for feature in features:
+                    writer.write(feature)
+    report_compaction(f"{abbr} {year}", compaction)
+    # A GeoParquet file is only created once there is at least one feature
+    return output_path, writer.count
+
+def run_pipeline(projects, years, output_dir=".", output_format="geojson.gz", page_size=500, max_workers=4,
+                 tolerance=None, precision=None, priority_order=PRIORITY_ORDER, store=None,
+                 acres_tolerance=None, fix_acres=False):
+    """Build PLET inputs for every project and year concurrently, optionally through a FieldStore."""
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    # A client sized to the worker count so every fetch keeps its connection alive
+    client = HasuraClient(pool_size=max_workers)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(build_plet_input, client, abbr, year, output_dir, output_format, page_size,
+                            tolerance, precision, priority_order, store, acres_tolerance, fix_acres): (abbr, year)
+            for abbr in projects
+            for year in years
+        }
+        for future in as_completed(futures):
+            abbr, year = futures[future]
+            try:
+                output_path, count = future.result()
+                print(f"Saved {count} PLET features for {abbr} {year}: {output_path}")
+            except Exception as e:
+                print(f"Failed to build PLET input for {abbr} {year}: {e}")
@@ -0,0 +1,160 @@
+"""
+Aggregation of PLET result GeoJSON, shared by plet/ and water/ process_geojson.py.
+
+PLET returns one feature per field/BMP with baseline (b_run_*) and
+post-BMP (p_run_*) loads and percent changes (pc_*). load_results reads
+only the feature properties into a DataFrame and aggregate_results sums
+the loads and averages the percent changes per field_id in one groupby.
+Results are written as a two-sheet workbook (xlsxwriter when installed)
+or as two Parquet files.
+
+field_id strings do not always survive the round trip (water inputs are
+renamed to {field_id}_{n}, boundaries get split), so results can instead
+be matched back to MRV field boundaries spatially: match_fields queries an
+STRtree over the boundaries with every result geometry at once and keeps
+the field with the largest intersection area.
+
+Usage:
+    python plet_results.py --input data/fields/results.geojson --output-dir data/fields/ --format parquet
+    python plet_results.py --input results.geojson --fields CIFCSC_2024.geojson
+"""
+import os
+import argparse
+import numpy as np
+import pandas as pd
+from geojson_io import iter_properties, read_geodataframe
+
+# Loads are summed per field; percent changes are averaged
+SUM_COLUMNS = ['b_run_v', 'b_run_n', 'b_run_p', 'b_run_s', 'p_run_n', 'p_run_p', 'p_run_s']
+MEAN_COLUMNS = ['pc_v', 'pc_n', 'pc_p', 'pc_s']
+
+
+def load_results(geojson_path, with_geometry=False):
+    """
+    Read the properties of every PLET result feature, field_id and id first.
+
+    With with_geometry a GeoDataFrame is returned (geometry last);
+    otherwise geometries are never parsed.
+    """
+    if with_geometry:
+        df = read_geodataframe(geojson_path)
+    else:
+        df = pd.DataFrame(iter_properties(geojson_path))
+    leading = [column for column in ['field_id', 'id'] if column in df]
+    return df[leading + [column for column in df.columns if column not in leading]]
+
+
+def match_fields(results, fields, field_key='id'):
+    """
+    Match each PLET result feature to the MRV field it overlaps most.
+
+    Args:
+        results (GeoDataFrame): PLET result features
+        fields (GeoDataFrame): MRV field boundaries
+        field_key (str): Column of fields holding the MRV field ID
+
+    Returns:
+        DataFrame: mrv_field_id and match_overlap (share of the result's area
+        inside that field; 1.0 for points) aligned to results.index.
+        Results overlapping no field (including ones that only touch a
+        field's edge) get a missing ID and an overlap of 0.
+    """
+    import shapely
+
+    if fields.crs is not None and results.crs is not None and fields.crs != results.crs:
+        fields = fields.to_crs(results.crs)
+    result_geometries = shapely.make_valid(results.geometry.to_numpy())
+    field_geometries = shapely.make_valid(fields.geometry.to_numpy())
+
+    # Every candidate pair in one bulk query instead of comparing all pairs
+    tree = shapely.STRtree(field_geometries)
+    result_index, field_index = tree.query(result_geometries, predicate='intersects')
+
+    own_area = shapely.area(result_geometries[result_index])
+    shared_area = shapely.area(shapely.intersection(result_geometries[result_index], field_geometries[field_index]))
+
+    # Areas that only share an edge or corner intersect but do not overlap
+    overlapping = (own_area == 0) | (shared_area > 0)
+    result_index, field_index = result_index[overlapping], field_index[overlapping]
+    own_area, shared_area = own_area[overlapping], shared_area[overlapping]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        overlap = np.where(own_area > 0, shared_area / own_area, 1.0)
+
+    # Keep the largest overlap per result
+    order = np.lexsort((-overlap, result_index))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = result_index[order][1:] != result_index[order][:-1]
+    best = order[first]
+
+    matches = pd.DataFrame({'mrv_field_id': pd.Series(pd.NA, index=results.index, dtype=object),
+                            'match_overlap': 0.0}, index=results.index)
+    rows = results.index[result_index[best]]
+    matches.loc[rows, 'mrv_field_id'] = fields[field_key].to_numpy()[field_index[best]]
+    matches.loc[rows, 'match_overlap'] = overlap[best].round(4)
+    return matches
+
+
+def aggregate_results(df, key='field_id'):
+    """Sum loads and average percent changes (rounded to 2 places) per key, field_id by default."""
+    aggregations = {column: 'sum' for column in SUM_COLUMNS if column in df}
+    aggregations.update({column: 'mean' for column in MEAN_COLUMNS if column in df})
+    aggregated = df.groupby(key, sort=False).agg(aggregations).reset_index()
+    mean_columns = [column for column in MEAN_COLUMNS if column in df]
+    aggregated[mean_columns] = aggregated[mean_columns].round(2)
+    return aggregated
+
+
+def write_results(df_output, df_aggregated, output_dir='data/fields/', output_format='xlsx'):
+    """
+    Write per-feature and per-field results.
+
+    xlsx writes plet_output.xlsx with Output and aggregated_results sheets;
+    parquet writes plet_output.parquet and plet_aggregated.parquet.
+    Returns the paths written.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if output_format == 'parquet':
+        paths = [os.path.join(output_dir, 'plet_output.parquet'), os.path.join(output_dir, 'plet_aggregated.parquet')]
+        df_output.to_parquet(paths[0], index=False)
+        df_aggregated.to_parquet(paths[1], index=False)
+        return paths
+
+    try:
+        import xlsxwriter  # noqa: F401 - much faster than openpyxl for large sheets
+        engine = 'xlsxwriter'
+    except ImportError:
+        engine = None
+    path = os.path.join(output_dir, 'plet_output.xlsx')
+    with pd.ExcelWriter(path, engine=engine) as writer:
+        df_output.to_excel(writer, sheet_name='Output', index=False)
+        df_aggregated.to_excel(writer, sheet_name='aggregated_results', index=False)
+    return [path]
+
+
+def main(default_input='data/fields/this_thing_works.geojson', default_output_dir='data/fields/'):
+    parser = argparse.ArgumentParser(description="Aggregate PLET result GeoJSON per field")
+    parser.add_argument("--input", default=default_input, help="PLET result GeoJSON")
+    parser.add_argument("--output-dir", default=default_output_dir, help="Directory for the output files")
+    parser.add_argument("--format", choices=["xlsx", "parquet"], default="xlsx",
+                        help="Two-sheet workbook or two Parquet files")
+    parser.add_argument("--fields", help="MRV field boundaries; results are matched and aggregated spatially")
+    parser.add_argument("--fields-id-key", default="id", help="Field boundary property holding the MRV field ID")
+    args = parser.parse_args()
+
+    if args.fields:
+        results = load_results(args.input, with_geometry=True)
+        fields = read_geodataframe(args.fields, columns=[args.fields_id_key])
+        matches = match_fields(results, fields, args.fields_id_key)
+        df_output = pd.DataFrame(results.drop(columns=results.geometry.name)).join(matches)
+        unmatched = int(df_output['mrv_field_id'].isna().sum())
+        print(f"Matched {len(df_output) - unmatched} of {len(df_output)} results to MRV fields")
+        df_aggregated = aggregate_results(df_output, key='mrv_field_id')
+    else:
+        df_output = load_results(args.input)
+        df_aggregated = aggregate_results(df_output)
+    for path in write_results(df_output, df_aggregated, args.output_dir, args.format):
+        print(f"{path} has been created successfully")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ from docx.enum.text import WD_UNDERLINE
 from docx.shared import RGBColor
 from docx.oxml.ns import qn
 import os
+from verified_data import load_verified, verified_path
 
 # year genearating reports for
 run_year = "2023"
@@ -15,8 +16,7 @@ mapping_df = pd.read_csv('Mapping.csv')
 producer_mapping = dict(zip(mapping_df['project_producer'], mapping_df['display_name']))
 
 def load_data(year, batch):
-    file_path = f"{year}_{batch}.csv" if batch == "Quantified" else f"{year}_{batch}.csv"
-    return pd.read_csv(file_path)
+    return load_verified(verified_path(year, batch))
 
 def format_cell_data(data):
     try:
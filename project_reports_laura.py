@@ -7,6 +7,7 @@ from docx.enum.text import WD_UNDERLINE
 from docx.shared import RGBColor
 from docx.oxml.ns import qn
 import os
+from verified_data import load_verified, verified_path
 
 # Year generating reports for
 run_year = "2023"
@@ -16,8 +17,7 @@ mapping_df = pd.read_csv('Mapping.csv')
 producer_mapping = dict(zip(mapping_df['project_producer'], mapping_df['display_name']))
 
 def load_data(year, batch):
-    file_path = f"{year}_{batch}.csv" if batch == "Quantified" else f"{year}_{batch}.csv"
-    return pd.read_csv(file_path)
+    return load_verified(verified_path(year, batch))
 
 def format_cell_data(data):
     try:
@@ -104,7 +104,7 @@ def generate_project_report(data, batch, doc):
     font_size = Pt(12)
     font_color = RGBColor(0, 0, 0)
 
-    for project, group in data.groupby('Project'):
+    for project, group in data.groupby('Project', observed=True):
         if project not in doc.projects:
             doc.projects[project] = initialize_document()
 
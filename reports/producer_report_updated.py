@@ -7,6 +7,11 @@ from docx.enum.text import WD_UNDERLINE
 from docx.shared import RGBColor
 from docx.oxml.ns import qn
 import os
+import sys
+
+# Shared modules live at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from verified_data import load_verified
 
 # year generating reports for
 run_year = "2023"
@@ -16,7 +21,7 @@ producer_mapping = dict(zip(mapping_df['project_producer'], mapping_df['display_
 
 def load_data():
     # Load carbon data
-    carbon_data = pd.read_csv('2023_Verified.csv')
+    carbon_data = load_verified('2023_Verified.csv')
     
     # Load water impacts data
     water_data = pd.read_excel('2024_PLET_Outcomes.xlsx')
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Shared modules live at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,20 @@
+import geopandas as gpd
+from shapely.geometry import Point, box
+
+from plet_results import match_fields
+
+
+def test_match_fields_ignores_results_that_only_touch_a_field():
+    fields = gpd.GeoDataFrame({"id": ["A", "B"]}, geometry=[box(0, 0, 1, 1), box(2, 0, 3, 1)])
+    results = gpd.GeoDataFrame(
+        {"field_id": ["inside", "touching", "point"]},
+        geometry=[box(0.2, 0.2, 0.8, 0.8), box(1, 0, 2, 1), Point(2.5, 0.5)]
+    )
+
+    matches = match_fields(results, fields)
+
+    assert matches.loc[0, "mrv_field_id"] == "A"
+    assert matches.loc[0, "match_overlap"] == 1.0
+    assert matches["mrv_field_id"].isna()[1]
+    assert matches.loc[1, "match_overlap"] == 0.0
+    assert matches.loc[2, "mrv_field_id"] == "B"
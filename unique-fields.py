@@ -1,51 +1,31 @@
-import json
+from geojson_io import iter_features, unique_property_values, write_feature_collection
 
-def read_geojson(file_path):
-    """Read and parse a GeoJSON file"""
-    with open(file_path, 'r') as f:
-        return json.load(f)
-
-def get_field_ids(geojson_data):
-    """Extract all fieldIds from a GeoJSON FeatureCollection"""
-    return {
-        feature['properties']['fieldId'] 
-        for feature in geojson_data['features'] 
-        if 'fieldId' in feature['properties']
-    }
-
-def create_filtered_geojson(geojson_2025, field_ids_2024):
-    """Create new GeoJSON with features only present in 2025"""
-    new_features = [
-        feature for feature in geojson_2025['features']
-        if 'fieldId' in feature['properties'] and 
-        feature['properties']['fieldId'] not in field_ids_2024
-    ]
-    
-    return {
-        "type": "FeatureCollection",
-        "features": new_features
-    }
+def iter_new_features(features, field_ids_before, seen_field_ids):
+    """Yield features whose fieldId is not in field_ids_before, recording every fieldId seen"""
+    for feature in features:
+        field_id = feature['properties'].get('fieldId')
+        if field_id is None:
+            continue
+        seen_field_ids.add(field_id)
+        if field_id not in field_ids_before:
+            yield feature
 
 def main():
-    # Read both GeoJSON files
-    geojson_2024 = read_geojson('CIF-2024.geojson')
-    geojson_2025 = read_geojson('CIF-2025.geojson')
-    
-    # Get sets of fieldIds from both years
-    field_ids_2024 = get_field_ids(geojson_2024)
-    field_ids_2025 = get_field_ids(geojson_2025)
-    
-    # Create new GeoJSON with unique 2025 features
-    new_geojson = create_filtered_geojson(geojson_2025, field_ids_2024)
+    # Only the 2024 fieldIds are held in memory; geometry is never parsed for them
+    field_ids_2024 = unique_property_values('CIF-2024.geojson', 'fieldId')
+    field_ids_2025 = set()
     
-    # Write the new GeoJSON to a file
-    with open('CIF-2025-unique.geojson', 'w') as f:
-        json.dump(new_geojson, f, indent=2)
+    # Stream 2025 features straight into the new GeoJSON file
+    new_count = write_feature_collection(
+        'CIF-2025-unique.geojson',
+        iter_new_features(iter_features('CIF-2025.geojson'), field_ids_2024, field_ids_2025),
+        indent=2
+    )
     
     # Print some statistics
     print(f"Fields in 2024: {len(field_ids_2024)}")
     print(f"Fields in 2025: {len(field_ids_2025)}")
-    print(f"Unique fields in 2025: {len(new_geojson['features'])}")
+    print(f"Unique fields in 2025: {new_count}")
     print(f"New GeoJSON file created: CIF-2025-unique.geojson")
 
 if __name__ == "__main__":
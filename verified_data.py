@@ -0,0 +1,209 @@
+"""
+Typed loader for the Verified/Quantified flat files ({year}_Verified.csv,
+{year}_Quantified.csv) shared by the analysis and report scripts.
+
+SCHEMA declares the dtypes of the known columns: the low-cardinality
+labels (project, commodity, state, practice change) are categoricals, IDs
+and names stay strings and the model outputs are floats; anything else is
+inferred as before. Each CSV is converted once to a Parquet cache keyed by
+the file's SHA-256, so later loads skip CSV parsing and read only the
+requested columns. Without pyarrow the CSV is read directly.
+
+Usage:
+    from verified_data import load_verified
+    df = load_verified(['2023_Verified.csv', '2022_Verified.csv'], columns=['Project', 'Acres'])
+"""
+import os
+import glob
+import hashlib
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+CACHE_DIR = '.verified_cache'  # created next to the CSV
+CONVERT_CHUNK_SIZE = 100000  # CSV rows held in memory while building the cache
+SCHEMA_VERSION = 1  # bump when SCHEMA changes to invalidate cached files
+
+CATEGORY_COLUMNS = ['Project', 'Commodity', 'field_state', 'Practice Change']
+STRING_COLUMNS = ['Field ID', 'Field Name (MRV)', 'Field Name (Project)', 'Producer (Project)', 'crop_yield']
+FLOAT_COLUMNS = [
+    'Acres', 'removed', 'reduced', 'reduced_adjusted', 'baseline_dsoc', 'dsoc',
+    'n2o_direct', 'n2o_indirect_adjusted', 'methane_adjusted', 'field_practice_emissions',
+    'soil_avg_soc', 'soil_avg_bulkdensity', 'soil_clay_fraction'
+]
+SCHEMA = {
+    **{column: 'category' for column in CATEGORY_COLUMNS},
+    **{column: 'str' for column in STRING_COLUMNS},
+    **{column: 'float64' for column in FLOAT_COLUMNS}
+}
+
+
+def verified_path(year, batch='Verified'):
+    """File name of a year's flat file, e.g. 2023_Verified.csv."""
+    return f'{year}_{batch}.csv'
+
+
+def read_header(csv_path):
+    """Column names of a flat file without reading any rows."""
+    return list(pd.read_csv(csv_path, nrows=0).columns)
+
+
+def file_hash(path, block_size=1 << 20):
+    """SHA-256 of a file's contents, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_csv_typed(csv_path, columns=None):
+    """Read a flat file with the SCHEMA dtypes of the columns it has."""
+    headers = read_header(csv_path)
+    dtype = {column: SCHEMA[column] for column in headers if column in SCHEMA}
+    return pd.read_csv(csv_path, usecols=columns, dtype=dtype, low_memory=False)
+
+
+def infer_dtypes(csv_path, chunk_size=CONVERT_CHUNK_SIZE):
+    """
+    dtypes of the columns outside SCHEMA, unified over every chunk.
+
+    Integer columns with missing values anywhere become float64 and any
+    text makes a column str, as a whole-file read would infer them.
+    """
+    headers = read_header(csv_path)
+    kinds = {column: set() for column in headers if column not in SCHEMA}
+    for chunk in pd.read_csv(csv_path, usecols=list(kinds), chunksize=chunk_size):
+        for column in kinds:
+            kinds[column].add(chunk[column].dtype.kind)
+    dtypes = {}
+    for column, column_kinds in kinds.items():
+        if column_kinds <= {'i'}:
+            dtypes[column] = 'int64'
+        elif column_kinds <= {'i', 'f'}:
+            dtypes[column] = 'float64'
+        elif column_kinds == {'b'}:
+            dtypes[column] = 'bool'
+        else:
+            dtypes[column] = 'str'
+    return dtypes
+
+
+def write_parquet_chunks(csv_path, parquet_path, chunk_size=CONVERT_CHUNK_SIZE):
+    """
+    Convert a flat file to Parquet one chunk at a time.
+
+    The Parquet schema is fixed up front (SCHEMA plus infer_dtypes), so
+    every chunk is written with the same types; categorical columns are
+    stored dictionary-encoded and load back as categoricals.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    headers = read_header(csv_path)
+    dtypes = {**infer_dtypes(csv_path, chunk_size), **{c: SCHEMA[c] for c in headers if c in SCHEMA}}
+    arrow_types = {
+        'category': pa.dictionary(pa.int32(), pa.string()),
+        'str': pa.string(),
+        'float64': pa.float64(),
+        'int64': pa.int64(),
+        'bool': pa.bool_()
+    }
+    schema = pa.schema([(column, arrow_types[dtypes[column]]) for column in headers])
+    read_dtypes = {column: 'str' if dtype == 'category' else dtype for column, dtype in dtypes.items()}
+
+    with pq.ParquetWriter(parquet_path, schema) as writer:
+        for chunk in pd.read_csv(csv_path, dtype=read_dtypes, chunksize=chunk_size):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            writer.write_table(table.select(headers).cast(schema))
+
+
+def cached_parquet(csv_path):
+    """
+    Path of the Parquet copy of a flat file, converting it if needed.
+
+    The cache file name holds the CSV's hash and the schema version, so an
+    edited CSV or a schema change is converted again; older copies of the
+    same CSV are removed.
+    """
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(csv_path)), CACHE_DIR)
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    key = f'{file_hash(csv_path)[:16]}-v{SCHEMA_VERSION}'
+    cache_path = os.path.join(cache_dir, f'{stem}-{key}.parquet')
+    if os.path.exists(cache_path):
+        return cache_path
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f'{cache_path}.tmp'
+    write_parquet_chunks(csv_path, tmp_path)
+    os.replace(tmp_path, cache_path)
+    for stale in glob.glob(os.path.join(cache_dir, f'{glob.escape(stem)}-*.parquet')):
+        if stale != cache_path:
+            os.remove(stale)
+    print(f"Cached {csv_path} as {cache_path}")
+    return cache_path
+
+
+def load_one(csv_path, columns=None, use_cache=True):
+    """Load one flat file, from its Parquet cache when pyarrow is installed."""
+    if use_cache:
+        try:
+            import pyarrow  # noqa: F401 - needed for the Parquet cache
+        except ImportError:
+            use_cache = False
+    if not use_cache:
+        return read_csv_typed(csv_path, columns)
+    return pd.read_parquet(cached_parquet(csv_path), columns=columns)
+
+
+def concat_frames(frames):
+    """Concatenate loaded files, keeping categoricals (with the union of their categories)."""
+    frames = list(frames)
+    if len(frames) == 1:
+        return frames[0]
+    frames = [frame.copy() for frame in frames]
+    for column in CATEGORY_COLUMNS:
+        present = [frame[column] for frame in frames if column in frame]
+        if not present or not all(isinstance(series.dtype, pd.CategoricalDtype) for series in present):
+            continue
+        categories = union_categoricals(present, sort_categories=True).categories
+        for frame in frames:
+            if column in frame:
+                frame[column] = frame[column].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
+
+
+def load_verified(paths, columns=None, use_cache=True):
+    """
+    Load one or more Verified/Quantified flat files into one DataFrame.
+
+    Args:
+        paths (str or list): CSV path(s)
+        columns (list): Columns to load; all columns when None
+        use_cache (bool): Read through the Parquet cache
+
+    Returns:
+        DataFrame: Rows of every file in order, typed by SCHEMA
+    """
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    return concat_frames(load_one(path, columns, use_cache) for path in paths)
+
+
+def iter_verified(csv_path, columns=None, chunk_size=50000):
+    """
+    Yield a flat file in DataFrames of at most chunk_size rows.
+
+    Batches are streamed from the Parquet cache when pyarrow is installed,
+    otherwise from the CSV.
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        headers = read_header(csv_path)
+        dtype = {column: SCHEMA[column] for column in headers if column in SCHEMA}
+        yield from pd.read_csv(csv_path, usecols=columns, dtype=dtype, chunksize=chunk_size)
+        return
+
+    parquet_file = pq.ParquetFile(cached_parquet(csv_path))
+    for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+        yield batch.to_pandas()
@@ -1,125 +1,203 @@
-import csv
-import json
-import datetime
 import os
-from dateutil import parser  # Import parser for flexible date parsing
+import sys
+import argparse
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from dateutil import parser
+
+# Shared modules live at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from geojson_io import FeatureCollectionWriter
+from verified_data import iter_verified, read_header
 
 # Input CSV file path
 csv_file_path = '2023_Verified.csv'
 
 # Output directory
 output_dir = 'water_inputs'
-os.makedirs(output_dir, exist_ok=True)  # Ensure the directory exists
-
-# Extract the year from the CSV file name
-year = int(csv_file_path.split('/')[-1].split('_')[0])
-
-# Define function to determine BMP name based on conditions
-def get_bmp_name(practice_change, planting_date, commodity):
-    if practice_change == "Cover cropping":
-        if not planting_date:
-            return "cov_crop_1"
-        else:
-            try:
-                # Attempt to parse the date in any format
-                planting_date = parser.parse(planting_date).replace(tzinfo=None)  # Remove timezone info
-            except ValueError:
-                # Skip if date format is incorrect
-                print(f"Skipping due to date format error: {planting_date}")
-                return None
-            
-            # Compare as offset-naive datetime
-            if datetime.datetime(year, 5, 1) <= planting_date <= datetime.datetime(year, 12, 31):
-                return "cov_crop_2"
-            elif datetime.datetime(year - 1, 1, 1) <= planting_date <= datetime.datetime(year, 4, 30):
-                return "cov_crop_3"
+
+# Header substrings used to locate each column (first matching header wins)
+COLUMN_PATTERNS = {
+    "project": "project",
+    "practice_change": "practice change",
+    "planting_date": "cover crop planting",
+    "field_id": "field id",
+    "field_name": "field name (project)",
+    "acres": "acres",
+    "longitude": "longitude",
+    "latitude": "latitude"
+}
+OPTIONAL_COLUMNS = {"planting_date"}
+
+def find_columns(headers):
+    """Map each logical column to the first header containing its pattern (case-insensitive)."""
+    normalized = {header.strip().lower(): header for header in headers}
+    columns = {}
+    for name, pattern in COLUMN_PATTERNS.items():
+        match = next((key for key in normalized if pattern in key), None)
+        if match is not None:
+            columns[name] = normalized[match]
+    return columns
+
+def iter_verified_csv(path, chunk_size=50000):
+    """
+    Read only the needed columns of a verified practices CSV in row batches.
+
+    Batches come from the shared Parquet cache (see verified_data). Yields
+    DataFrames with the logical column names from COLUMN_PATTERNS, text
+    columns as strings with missing values as ""; yields nothing if a
+    required column is missing.
+    """
+    columns = find_columns(read_header(path))
+    missing = [name for name in COLUMN_PATTERNS if name not in columns and name not in OPTIONAL_COLUMNS]
+    if missing:
+        print(f"Error: Required columns not found in the CSV: {', '.join(missing)}")
+        return
+
+    renames = {header: name for name, header in columns.items()}
+    numeric = ["acres", "longitude", "latitude"]
+    for df in iter_verified(path, list(columns.values()), chunk_size):
+        df = df.rename(columns=renames)
+        if "planting_date" not in df:
+            df["planting_date"] = ""
+        for column in df.columns:
+            if column in numeric:
+                df[column] = df[column].astype(float)
             else:
-                return "cov_crop_1"
-    elif practice_change == "Tillage reduction":
-        return "cons_till_1"
-    elif practice_change == "Nutrient management":
-        return "nutrient_mgmt_2"
-    else:
-        return None
-
-
-# Read the CSV file, normalize headers, and process each row
-project_geojsons = {}
-
-with open(csv_file_path, 'r') as csvfile:
-    csvreader = csv.reader(csvfile)
-    headers = next(csvreader)
-    headers = [header.strip() for header in headers]  # Normalize headers by stripping whitespace
-    normalized_headers = {header.lower(): index for index, header in enumerate(headers)}  # Map lowercase header to index
-
-    # Locate column names dynamically
-    project_col = next((key for key in normalized_headers if "project" in key), None)
-    practice_change_col = next((key for key in normalized_headers if "practice change" in key), None)
-    planting_date_col = next((key for key in normalized_headers if "cover crop planting" in key), None)
-    commodity_col = next((key for key in normalized_headers if "commodity" in key), None)
-    field_id_col = next((key for key in normalized_headers if "field id" in key), None)
-    field_name_col = next((key for key in normalized_headers if "field name (project)" in key), None)
-    acres_col = next((key for key in normalized_headers if "acres" in key), None)
-    longitude_col = next((key for key in normalized_headers if "longitude" in key), None)
-    latitude_col = next((key for key in normalized_headers if "latitude" in key), None)
-
-    # Check if required columns exist
-    required_columns = [project_col, practice_change_col, field_id_col, field_name_col, acres_col, longitude_col, latitude_col]
-    if not all(required_columns):
-        print("Error: One or more required columns not found in the CSV.")
-        exit()
-
-    # Process each row
-    for row in csvreader:
-        project_value = row[normalized_headers[project_col]]
-        
-        # Initialize a GeoJSON for each unique project
-        if project_value not in project_geojsons:
-            project_geojsons[project_value] = {
-                "type": "FeatureCollection",
-                "features": []
-            }
-        
-        # Split practices and process each individually
-        practice_changes = row[normalized_headers[practice_change_col]].split(", ")
-        planting_date = row[normalized_headers[planting_date_col]] if planting_date_col else ""
-        commodity = row[normalized_headers[commodity_col]] if commodity_col else ""
-        field_id = row[normalized_headers[field_id_col]]
-        field_name = row[normalized_headers[field_name_col]]
-        acres = float(row[normalized_headers[acres_col]])
-        longitude = float(row[normalized_headers[longitude_col]])
-        latitude = float(row[normalized_headers[latitude_col]])
-
-        for index, practice in enumerate(practice_changes, start=1):
-            bmp_name = get_bmp_name(practice, planting_date, commodity)
-            if not bmp_name:
-                continue  # Skip if BMP name is not defined
-
-            # Prepare feature for GeoJSON
-            feature = {
-                "type": "Feature",
-                "properties": {
-                    "id": f"{field_id}_{index}",
-                    "field_id": field_name,
-                    "user_lu": "cropland",
-                    "bmp_name": bmp_name,
-                    "bmp_acre": acres,
-                    "n_months": 0,
-                    "m_area_ac": 0,
-                },
-                "geometry": {
-                    "type": "Point",
-                    "coordinates": [
-                        longitude,
-                        latitude
-                    ]
-                }
+                df[column] = df[column].astype(object).where(df[column].notna(), "").astype(str)
+        yield df
+
+def parse_planting_date(value):
+    """Parse a planting date in any format, keeping its wall time and dropping any UTC offset."""
+    try:
+        return pd.Timestamp(parser.parse(value).replace(tzinfo=None))
+    except (ValueError, OverflowError):
+        return pd.NaT
+
+def assign_bmp_names(practices, planting_dates, year):
+    """
+    Vectorized BMP name for each practice change.
+
+    Cover crops planted May 1 - Dec 31 of the year are cov_crop_2, those
+    planted Jan 1 of the prior year - Apr 30 are cov_crop_3, anything else
+    (or no date) is cov_crop_1. Unparseable planting dates and unknown
+    practices get None.
+    """
+    dates = planting_dates.str.strip()
+    # Each distinct date string is parsed once
+    unique_dates = dates[dates != ""].unique()
+    parsed = pd.to_datetime(dates.map(dict(zip(unique_dates, map(parse_planting_date, unique_dates)))))
+    cover_crop = practices == "Cover cropping"
+    no_date = dates == ""
+    bad_date = cover_crop & ~no_date & parsed.isna()
+    for value in dates[bad_date]:
+        print(f"Skipping due to date format error: {value}")
+
+    conditions = [
+        cover_crop & no_date,
+        cover_crop & parsed.between(pd.Timestamp(year, 5, 1), pd.Timestamp(year, 12, 31)),
+        cover_crop & parsed.between(pd.Timestamp(year - 1, 1, 1), pd.Timestamp(year, 4, 30)),
+        cover_crop & ~bad_date,
+        practices == "Tillage reduction",
+        practices == "Nutrient management"
+    ]
+    choices = ["cov_crop_1", "cov_crop_2", "cov_crop_3", "cov_crop_1", "cons_till_1", "nutrient_mgmt_2"]
+    bmp_names = pd.Series(np.select(conditions, choices, default=""), index=practices.index)
+    return bmp_names.where(bmp_names != "")
+
+def practice_rows(df, year):
+    """
+    One row per (field, practice change) with its BMP name.
+
+    Practice changes are split on ", " and numbered from 1 in their original
+    order, so feature IDs stay stable when some practices have no BMP.
+    """
+    rows = df.assign(practice=df["practice_change"].str.split(", ")).explode("practice")
+    rows["index"] = rows.groupby(level=0).cumcount() + 1
+    rows = rows.reset_index(drop=True)
+    rows["bmp_name"] = assign_bmp_names(rows["practice"], rows["planting_date"], year)
+    rows = rows[rows["bmp_name"].notna()]
+    rows["id"] = rows["field_id"] + "_" + rows["index"].astype(str)
+    return rows
+
+def project_features(rows):
+    """Build the water input GeoJSON features for a block of practice rows."""
+    # tolist() gives plain Python values, which orjson can serialize
+    columns = [rows[column].tolist() for column in ["id", "field_name", "bmp_name", "acres", "longitude", "latitude"]]
+    return [
+        {
+            "type": "Feature",
+            "properties": {
+                "id": feature_id,
+                "field_id": field_name,
+                "user_lu": "cropland",
+                "bmp_name": bmp_name,
+                "bmp_acre": acres,
+                "n_months": 0,
+                "m_area_ac": 0,
+            },
+            "geometry": {
+                "type": "Point",
+                "coordinates": [
+                    longitude,
+                    latitude
+                ]
             }
-            project_geojsons[project_value]["features"].append(feature)
-
-# Write each project GeoJSON to a separate file in the output directory
-for project, geojson_data in project_geojsons.items():
-    output_geojson_path = f'{output_dir}/{project.replace(" ", "_")}_{year}.geojson'
-    with open(output_geojson_path, 'w') as geojsonfile:
-        json.dump(geojson_data, geojsonfile, indent=2)
-    print(f"GeoJSON file for project '{project}' has been created at {output_geojson_path}")
+        }
+        for feature_id, field_name, bmp_name, acres, longitude, latitude in zip(*columns)
+    ]
+
+def write_project_rows(writer, rows):
+    """Serialize one project's practice rows from a batch into its open writer."""
+    writer.write_many(project_features(rows))
+
+def create_inputs(csv_path=csv_file_path, output_path=output_dir, output_format="geojson", indent=None,
+                  chunk_size=50000, max_workers=4):
+    """
+    Convert a verified practices CSV into one water input GeoJSON per project.
+
+    The CSV is processed in batches of chunk_size rows; each batch's
+    features are streamed into the per-project files, with the projects of
+    a batch serialized and written in parallel. Output is compact unless an
+    indent is given, and gzipped for output_format "geojson.gz".
+    """
+    os.makedirs(output_path, exist_ok=True)  # Ensure the directory exists
+
+    # Extract the year from the CSV file name
+    year = int(os.path.basename(csv_path).split('_')[0])
+
+    writers = {}
+    with ExitStack() as stack:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for df in iter_verified_csv(csv_path, chunk_size):
+                # Every project in the CSV gets a file, even if none of its practices map to a BMP
+                for project in df["project"].unique():
+                    if project not in writers:
+                        path = f'{output_path}/{project.replace(" ", "_")}_{year}.{output_format}'
+                        writers[project] = stack.enter_context(FeatureCollectionWriter(path, indent=indent))
+
+                # One task per project, so each file is only written by one thread at a time
+                rows = practice_rows(df, year)
+                futures = [
+                    executor.submit(write_project_rows, writers[project], project_rows)
+                    for project, project_rows in rows.groupby("project", sort=False)
+                ]
+                for future in futures:
+                    future.result()
+
+    for project, writer in writers.items():
+        print(f"GeoJSON file for project '{project}' has been created at {writer.path} ({writer.count} features)")
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Create water model inputs from a verified practices CSV")
+    arg_parser.add_argument("--input", default=csv_file_path, help="Verified CSV named <year>_*.csv")
+    arg_parser.add_argument("--output-dir", default=output_dir, help="Directory for per-project GeoJSON files")
+    arg_parser.add_argument("--format", choices=["geojson", "geojson.gz"], default="geojson",
+                            help="Plain or gzipped GeoJSON output")
+    arg_parser.add_argument("--indent", type=int, help="Pretty-print with this indent instead of compact output")
+    arg_parser.add_argument("--chunk-size", type=int, default=50000, help="CSV rows processed per batch")
+    arg_parser.add_argument("--workers", type=int, default=4, help="Projects written in parallel")
+    args = arg_parser.parse_args()
+    create_inputs(args.input, args.output_dir, args.format, args.indent, args.chunk_size, args.workers)